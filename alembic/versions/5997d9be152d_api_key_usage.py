@@ -0,0 +1,30 @@
+"""api key usage
+
+Revision ID: 5997d9be152d
+Revises: e535ecd61d9e
+Create Date: 2026-10-18 15:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '5997d9be152d'
+down_revision: Union[str, None] = 'e535ecd61d9e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('api_key') as batch_op:
+        batch_op.add_column(sa.Column('usage_count', sa.BigInteger(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('last_used_at', postgresql.TIMESTAMP(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('api_key') as batch_op:
+        batch_op.drop_column('last_used_at')
+        batch_op.drop_column('usage_count')
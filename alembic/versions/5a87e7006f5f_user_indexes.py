@@ -0,0 +1,28 @@
+"""user indexes
+
+Revision ID: 5a87e7006f5f
+Revises: 9a160aab824b
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '5a87e7006f5f'
+down_revision: Union[str, None] = '9a160aab824b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_user_type'), 'user', ['type'], unique=False)
+    op.create_index(op.f('ix_user_credits'), 'user', ['credits'], unique=False)
+    op.create_index('ix_user_created_at_id', 'user', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_created_at_id', table_name='user')
+    op.drop_index(op.f('ix_user_credits'), table_name='user')
+    op.drop_index(op.f('ix_user_type'), table_name='user')
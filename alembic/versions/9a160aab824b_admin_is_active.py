@@ -0,0 +1,27 @@
+"""admin is_active
+
+Revision ID: 9a160aab824b
+Revises: 3d0423990eec
+Create Date: 2026-10-18 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '9a160aab824b'
+down_revision: Union[str, None] = '3d0423990eec'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('admin') as batch_op:
+        batch_op.add_column(sa.Column('is_active', sa.Boolean(), server_default=sa.true(), nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('admin') as batch_op:
+        batch_op.drop_column('is_active')
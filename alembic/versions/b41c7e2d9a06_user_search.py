@@ -0,0 +1,57 @@
+"""user search
+
+Revision ID: b41c7e2d9a06
+Revises: 5997d9be152d
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41c7e2d9a06'
+down_revision: Union[str, None] = '5997d9be152d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.create_index(
+            'ix_user_user_name_trgm', 'user', ['user_name'], unique=False,
+            postgresql_using='gin', postgresql_ops={'user_name': 'gin_trgm_ops'},
+        )
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE user_search USING fts5("
+            "user_name, content='user', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            'CREATE TRIGGER user_search_ai AFTER INSERT ON "user" BEGIN '
+            'INSERT INTO user_search(rowid, user_name) VALUES (new.id, new.user_name); END'
+        )
+        op.execute(
+            'CREATE TRIGGER user_search_ad AFTER DELETE ON "user" BEGIN '
+            "INSERT INTO user_search(user_search, rowid, user_name) VALUES ('delete', old.id, old.user_name); END"
+        )
+        op.execute(
+            'CREATE TRIGGER user_search_au AFTER UPDATE OF user_name ON "user" BEGIN '
+            "INSERT INTO user_search(user_search, rowid, user_name) VALUES ('delete', old.id, old.user_name); "
+            'INSERT INTO user_search(rowid, user_name) VALUES (new.id, new.user_name); END'
+        )
+        op.execute("INSERT INTO user_search(user_search) VALUES ('rebuild')")
+    # Other backends search with a plain LIKE scan.
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.drop_index('ix_user_user_name_trgm', table_name='user', postgresql_using='gin')
+    elif dialect == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS user_search_au')
+        op.execute('DROP TRIGGER IF EXISTS user_search_ad')
+        op.execute('DROP TRIGGER IF EXISTS user_search_ai')
+        op.execute('DROP TABLE IF EXISTS user_search')
@@ -1,4 +1,4 @@
-from app.db.session import sync_engine
+from app.db.session import engine
 from fastapi import FastAPI
 from starlette_admin.contrib.sqla import Admin
 
@@ -13,7 +13,7 @@ settings = Settings()
 
 def setup_admin(app: FastAPI) -> None:
     admin = Admin(
-        engine=sync_engine,
+        engine=engine,
         templates_dir=f"{settings.TEMPLATES_DIR}/admin",
         statics_dir=f"{settings.STATIC_DIR}/admin",
         auth_provider=AdminAuthProvider(),
@@ -1,6 +1,7 @@
 from typing import Optional
 
-from app.db.repository.admin import AdminRepository
+from app.core.security import PasswordHasherBusy
+from app.db.repository.admin import AdminIdentity, AdminRepository, admin_identities
 from app.db.session import async_session_maker
 from starlette.requests import Request
 from starlette.responses import Response
@@ -18,7 +19,7 @@ class AdminAuthProvider(AuthProvider):
         if admin_id is None:
             return False
 
-        admin = await self._repo.get(admin_id)
+        admin = await self._repo.get_identity(admin_id)
         if admin is None or not admin.is_active:
             request.session.clear()
             return False
@@ -37,11 +38,17 @@ class AdminAuthProvider(AuthProvider):
         if len(username or "") < 3:
             raise FormValidationError({"username": "Ім’я мінімум 3 символи"})
 
-        admin = await self._repo.authenticate(username, password)
+        try:
+            admin = await self._repo.authenticate(username, password)
+        except PasswordHasherBusy:
+            raise LoginFailed("Сервер перевантажено, спробуйте пізніше")
         if admin is None or not admin.is_active:
             raise LoginFailed("Неправильний логін або пароль")
 
         request.session.update({"admin_id": admin.id})
+        admin_identities.put(
+            AdminIdentity(id=admin.id, user_name=admin.user_name, is_active=admin.is_active)
+        )
 
         if remember_me:
             response.set_cookie(
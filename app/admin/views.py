@@ -1,4 +1,12 @@
+from typing import Any, Dict, Union
+
+from app.core.config import settings
+from app.db.count import count_rows
 from app.db.models import User
+from app.db.repository.base import build_select
+from app.db.repository.user import SEARCH_MIN_LENGTH, search_condition
+from sqlalchemy import Select
+from starlette.requests import Request
 from starlette_admin.contrib.sqla import ModelView
 
 from .config import setup_admin_defaults, ADMIN_ICON
@@ -12,3 +20,26 @@ class UserView(ModelView):
             icon=ADMIN_ICON["user"]
         )
 
+    def get_list_query(self, request: Request) -> Select:
+        # Plain users listing: user table only, no Admin columns or joins.
+        return build_select(User, load_only=[c.key for c in User.__mapper__.column_attrs])
+
+    def get_details_query(self, request: Request) -> Select:
+        return self.get_list_query(request)
+
+    async def count(
+            self, request: Request, where: Union[Dict[str, Any], str, None] = None
+    ) -> int:
+        # Unfiltered pages show the whole-table count, which need not be exact.
+        if where is None:
+            return await count_rows(
+                request.state.session, self.model, settings.ADMIN_COUNT_STRATEGY
+            )
+        return await super().count(request, where)
+
+    async def build_full_text_search_query(self, request: Request, term: str, model: Any) -> Any:
+        # Index-backed search on user_name instead of ILIKE over every text column.
+        term = term.strip()
+        if len(term) < SEARCH_MIN_LENGTH:
+            return super().get_search_query(request, term)
+        return search_condition(request.state.session.bind.dialect.name, term)
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends
 
 from app.core.security import verify_api_key
+from .internal import router as internal_router
 from .user import router as user_router
 
 api_router = APIRouter(
@@ -9,3 +10,4 @@ api_router = APIRouter(
 )
 
 api_router.include_router(user_router, prefix="/user", tags=["user"])
+api_router.include_router(internal_router, prefix="/internal", tags=["internal"])
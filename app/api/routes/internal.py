@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+
+from app.db.cache import caches
+from app.db.pool import async_pool_stats, sync_pool_stats
+from app.db import session
+
+router = APIRouter()
+
+
+@router.get("/pool")
+async def read_pool_stats():
+    stats = {"async": async_pool_stats.snapshot(session.engine.pool)}
+    sync_engine = session.peek_sync_engine()
+    if sync_engine is not None:
+        stats["sync"] = sync_pool_stats.snapshot(sync_engine.pool)
+    return stats
+
+
+@router.get("/cache")
+async def read_cache_stats():
+    return {namespace: cache.stats() for namespace, cache in caches.items()}
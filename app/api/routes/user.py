@@ -1,14 +1,47 @@
-from app.db.repository import UserRepository
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Literal
+
+from app.core.config import settings
+from app.db.cache import get_cache
+from app.db.models import User
+from app.db.repository import CreditRepository, InsufficientCredits, UserRepository
+from app.db.repository.user import SEARCH_MIN_LENGTH
 from app.db.session import get_session, async_session_maker
-from fastapi import APIRouter, Depends, HTTPException
+from app.services.credits import credit_batcher
+from app.utils.loader import BatchLoader
+from app.utils.serialization import rows_response
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import schemas
 
 router = APIRouter()
 
+BULK_MAX_ROWS = 10_000
+MULTI_GET_MAX_IDS = 100
+SEARCH_MAX_LIMIT = 100
+USER_COLUMNS = tuple(schemas.User.model_fields)
+
+
+def get_user_repo(_: AsyncSession = Depends(get_session)):
+    return UserRepository(async_session_maker, get_cache("user", User))
+
+
+async def _load_by_chat_ids(chat_ids: list[int]) -> dict[int, User]:
+    repo = UserRepository(async_session_maker, get_cache("user", User))
+    return await repo.get_many_by_chat_id(chat_ids)
+
 
-def get_user_repo():
-    return UserRepository(async_session_maker)
+# Single chat_id lookups made in the same loop tick share one IN query.
+chat_id_loader: BatchLoader[int, User] = BatchLoader(_load_by_chat_ids, MULTI_GET_MAX_IDS)
+
+
+def get_credit_repo(_: AsyncSession = Depends(get_session)):
+    return CreditRepository(async_session_maker, get_cache("user", User))
 
 
 @router.post("", response_model=schemas.User)
@@ -16,9 +49,106 @@ async def create_user(user: schemas.UserCreate, repo: UserRepository = Depends(g
     return await repo.create(user)
 
 
+@router.post("/bulk", response_class=StreamingResponse)
+async def bulk_upsert_users(
+        users: list[schemas.UserCreate],
+        repo: UserRepository = Depends(get_user_repo),
+):
+    """Upsert users by chat_id; streams one NDJSON ``UserUpsertResult`` per row."""
+    if len(users) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ROWS} users per request")
+
+    async def _stream():
+        async for results in repo.bulk_upsert(users):
+            for result in results:
+                yield result.model_dump_json() + "\n"
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
+
+
 @router.get("", response_model=list[schemas.User])
 async def read_users(skip: int = 0, limit: int = 100, repo: UserRepository = Depends(get_user_repo)):
-    return await repo.list(skip=skip, limit=limit)
+    rows = await repo.list_rows(USER_COLUMNS, skip=skip, limit=limit)
+    return rows_response(USER_COLUMNS, rows)
+
+
+@router.get("/page", response_model=schemas.UserPage)
+async def read_users_page(
+        cursor: str | None = None,
+        limit: int = Query(100, ge=1, le=1000),
+        order_by: schemas.UserOrdering = "id",
+        repo: UserRepository = Depends(get_user_repo),
+):
+    try:
+        items, next_cursor = await repo.paginate(
+            cursor=cursor, limit=limit, order_by=order_by, load_only=USER_COLUMNS
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def _plain(row) -> list:
+    return [v.isoformat() if isinstance(v, datetime) else v for v in row]
+
+
+def _ndjson_lines(rows) -> str:
+    return "".join(
+        json.dumps(dict(zip(USER_COLUMNS, _plain(row)))) + "\n" for row in rows
+    )
+
+
+def _csv_lines(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(_plain(row) for row in rows)
+    return buffer.getvalue()
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_users(
+        format: Literal["ndjson", "csv"] = "ndjson",
+        after_id: int | None = None,
+        repo: UserRepository = Depends(get_user_repo),
+):
+    """Stream every user in id order; pass the last exported id as ``after_id`` to resume."""
+    render = _ndjson_lines if format == "ndjson" else _csv_lines
+
+    async def _stream():
+        if format == "csv" and after_id is None:
+            yield ",".join(USER_COLUMNS) + "\r\n"
+        async for rows in repo.stream_rows(USER_COLUMNS, after_id=after_id):
+            yield render(rows)
+
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    return StreamingResponse(_stream(), media_type=media_type)
+
+
+@router.get("/search", response_model=list[schemas.User])
+async def search_users(
+        q: str = Query(..., min_length=SEARCH_MIN_LENGTH, max_length=100),
+        limit: int = Query(20, ge=1, le=SEARCH_MAX_LIMIT),
+        repo: UserRepository = Depends(get_user_repo),
+):
+    """Users whose name contains ``q``, best matches first."""
+    rows = await repo.search(q, USER_COLUMNS, limit=limit)
+    return rows_response(USER_COLUMNS, rows)
+
+
+@router.get("/by-chat", response_model=list[schemas.User])
+async def read_users_by_chat_ids(
+        chat_id: list[int] = Query(..., max_length=MULTI_GET_MAX_IDS),
+        repo: UserRepository = Depends(get_user_repo),
+):
+    found = await repo.get_many_by_chat_id(chat_id)
+    return [found[c] for c in dict.fromkeys(chat_id) if c in found]
+
+
+@router.get("/by-chat/{chat_id}", response_model=schemas.User)
+async def read_user_by_chat_id(chat_id: int):
+    result = await chat_id_loader.load(chat_id)
+    if not result:
+        raise HTTPException(status_code=404, detail="User not found")
+    return result
 
 
 @router.get("/{id}", response_model=schemas.User)
@@ -27,3 +157,43 @@ async def read_user(id: int, repo: UserRepository = Depends(get_user_repo)):
     if not result:
         raise HTTPException(status_code=404, detail="User not found")
     return result
+
+
+@router.post("/{id}/credits/debit", response_model=schemas.CreditBalance)
+async def debit_credits(
+        id: int,
+        change: schemas.CreditChange,
+        repo: CreditRepository = Depends(get_credit_repo),
+):
+    try:
+        balance = await repo.debit(id, change.amount, change.reason)
+    except InsufficientCredits:
+        raise HTTPException(status_code=409, detail="Insufficient credits")
+    if balance is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"user_id": id, "credits": balance}
+
+
+@router.get("/{id}/credits/history", response_model=list[schemas.CreditTransaction])
+async def read_credit_history(
+        id: int,
+        limit: int = Query(100, ge=1, le=1000),
+        repo: CreditRepository = Depends(get_credit_repo),
+):
+    """The user's ledger entries, newest first."""
+    return await repo.history(id, limit=limit)
+
+
+@router.post("/{id}/credits/credit", response_model=schemas.CreditBalance)
+async def credit_credits(
+        id: int,
+        change: schemas.CreditChange,
+        repo: CreditRepository = Depends(get_credit_repo),
+):
+    if settings.CREDIT_BATCHING:
+        balance = await credit_batcher.credit(id, change.amount, change.reason)
+    else:
+        balance = await repo.credit(id, change.amount, change.reason)
+    if balance is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"user_id": id, "credits": balance}
@@ -22,11 +22,31 @@ class Settings(BaseSettings):
     DB_HOST: str = env.str("DB_HOST", "")
     DB_PORT: int = env.int("DB_PORT", 0)
 
+    DB_POOL_SIZE: int = env.int("DB_POOL_SIZE", 5)
+    DB_MAX_OVERFLOW: int = env.int("DB_MAX_OVERFLOW", 10)
+    DB_POOL_TIMEOUT: float = env.float("DB_POOL_TIMEOUT", 30.0)
+    DB_POOL_RECYCLE: int = env.int("DB_POOL_RECYCLE", -1)
+    DB_POOL_PRE_PING: bool = env.bool("DB_POOL_PRE_PING", False)
+
+    COUNT_STRATEGY: str = env.str("COUNT_STRATEGY", "exact")
+    ADMIN_COUNT_STRATEGY: str = env.str("ADMIN_COUNT_STRATEGY", "estimated")
+    COUNT_ESTIMATE_MIN: int = env.int("COUNT_ESTIMATE_MIN", 100_000)
+    COUNT_CACHE_TTL: float = env.float("COUNT_CACHE_TTL", 60.0)
+
+    DB_PROFILING: bool = env.bool("DB_PROFILING", False)
+    DB_SLOW_QUERY_MS: float = env.float("DB_SLOW_QUERY_MS", 200.0)
+    DB_N_PLUS_ONE_THRESHOLD: int = env.int("DB_N_PLUS_ONE_THRESHOLD", 5)
+
     SERVER_ADDRESS: str = env.str("SERVER_ADDRESS")
     SERVER_PORT: int = env.int("SERVER_PORT")
 
     STORAGE_DIR: str = "uploads"
     STORAGE_URL: str = "/uploads"
+    # Outside STORAGE_DIR so it is not served with the uploads.
+    STORAGE_INDEX_PATH: str = env.str("STORAGE_INDEX_PATH", "storage_index.sqlite3")
+    STORAGE_RECONCILE_WORKERS: int = env.int("STORAGE_RECONCILE_WORKERS", 4)
+    STORAGE_IO_WORKERS: int = env.int("STORAGE_IO_WORKERS", 8)
+    STORAGE_IO_CHUNK_SIZE: int = env.int("STORAGE_IO_CHUNK_SIZE", 1024 * 1024)
     STATIC_DIR: str = "static"
     TEMPLATES_DIR: str = "app/templates"
     STATIC_URL: str = "/static"
@@ -36,9 +56,44 @@ class Settings(BaseSettings):
     ADMIN_PRIMARY_COLOR: str = env.str("ADMIN_PRIMARY_COLOR")
     ADMIN_SITE_LOGO: str = env.str("ADMIN_SITE_LOGO")
     ADMIN_SITE_FAVICON: str = env.str("ADMIN_SITE_FAVICON")
+    ADMIN_IDENTITY_TTL: float = env.float("ADMIN_IDENTITY_TTL", 30.0)
     DEBUG: bool = True
 
+    LOG_LEVEL: str = env.str("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = env.str("LOG_FORMAT", "json")
+    LOG_QUEUE_SIZE: int = env.int("LOG_QUEUE_SIZE", 10_000)
+    LOG_DEBUG_SAMPLE_RATE: float = env.float("LOG_DEBUG_SAMPLE_RATE", 1.0)
+
+    METRICS_ENABLED: bool = env.bool("METRICS_ENABLED", True)
+    # Bearer token for scrapers; when empty, /metrics takes an API key instead.
+    METRICS_TOKEN: str = env.str("METRICS_TOKEN", "")
+
     API_KEY: str = env.str("API_KEY", "sk-your-default-api-key-2024")
+    API_KEY_RELOAD_INTERVAL: float = env.float("API_KEY_RELOAD_INTERVAL", 30.0)
+    API_KEY_USAGE_FLUSH_INTERVAL: float = env.float("API_KEY_USAGE_FLUSH_INTERVAL", 10.0)
+
+    RATE_LIMIT_BACKEND: str = env.str("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_PER_SECOND: float = env.float("RATE_LIMIT_PER_SECOND", 10.0)
+    RATE_LIMIT_BURST: int = env.int("RATE_LIMIT_BURST", 20)
+
+    ADMISSION_MAX_CONCURRENCY: int = env.int("ADMISSION_MAX_CONCURRENCY", 64)
+    ADMISSION_MAX_QUEUE: int = env.int("ADMISSION_MAX_QUEUE", 128)
+    ADMISSION_QUEUE_TIMEOUT: float = env.float("ADMISSION_QUEUE_TIMEOUT", 2.0)
+    ADMISSION_RETRY_AFTER: int = env.int("ADMISSION_RETRY_AFTER", 1)
+    ADMISSION_ROUTE_LIMITS: str = env.str("ADMISSION_ROUTE_LIMITS", "")
+
+    PASSWORD_HASH_ROUNDS: int = env.int("PASSWORD_HASH_ROUNDS", 12)
+    PASSWORD_HASH_WORKERS: int = env.int("PASSWORD_HASH_WORKERS", 2)
+    PASSWORD_HASH_QUEUE: int = env.int("PASSWORD_HASH_QUEUE", 32)
+
+    CACHE_BACKEND: str = env.str("CACHE_BACKEND", "none")
+    CACHE_TTL: float = env.float("CACHE_TTL", 60.0)
+    CACHE_MAX_SIZE: int = env.int("CACHE_MAX_SIZE", 10_000)
+    REDIS_URL: str = env.str("REDIS_URL", "redis://localhost:6379/0")
+
+    CREDIT_BATCHING: bool = env.bool("CREDIT_BATCHING", False)
+    CREDIT_BATCH_DELAY: float = env.float("CREDIT_BATCH_DELAY", 0.05)
+    CREDIT_BATCH_SIZE: int = env.int("CREDIT_BATCH_SIZE", 500)
 
     @property
     def DATABASE_URL(self) -> str:
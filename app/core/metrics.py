@@ -0,0 +1,307 @@
+"""In-process metrics in the Prometheus text exposition format.
+
+Every metric is a dict keyed by label values, updated under one short
+lock, so recording costs a dict lookup and a few additions. Nothing is
+rendered until ``/metrics`` is scraped.
+"""
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.db.pool import PoolStats
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+            *self.samples(),
+        ]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [
+            f"{self.name}{_labels(self.labelnames, key)} {value}"
+            for key, value in values.items()
+        ]
+
+
+class Gauge(Metric):
+    """Read at scrape time from ``fn``, which returns ``{label values: value}``.
+
+    ``type`` may be set to ``"counter"`` for totals kept elsewhere.
+    """
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), fn: Callable[[], Dict] = dict, type=None) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._fn = fn
+        if type is not None:
+            self.type = type
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_labels(self.labelnames, key)} {value}"
+            for key, value in self._fn().items()
+        ]
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = {key: list(series) for key, series in self._values.items()}
+
+        lines = []
+        for key, series in values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                cumulative += count
+                lines.append(_bucket_line(self.name, self.labelnames, key, bound, cumulative))
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+def _bucket_line(name: str, labelnames, key, bound, cumulative) -> str:
+    le = 'le="%s"' % bound
+    return f"{name}_bucket{_labels(labelnames, key, le)} {cumulative}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds",
+    "Time to produce a response, by route template.",
+    ("method", "route", "status"),
+))
+db_query_duration = registry.register(Histogram(
+    "db_query_duration_seconds",
+    "Time spent in cursor.execute, by engine and statement type.",
+    ("engine", "operation"),
+))
+repository_call_duration = registry.register(Histogram(
+    "repository_call_duration_seconds",
+    "Time spent in a repository unit of work, including session checkout.",
+    ("method",),
+))
+
+
+class MetricsMiddleware:
+    """Times every HTTP request and labels it with the matched route template.
+
+    The template (``/api/user/{id}``) rather than the raw path keeps the
+    number of series bounded; requests no route matched are labelled
+    ``unmatched``.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            http_request_duration.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status_code),
+            )
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Record every statement ``engine`` sends, keyed by its leading keyword."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_query_started", None)
+        if started is not None:
+            operation = statement.lstrip().split(None, 1)[0].upper() if statement else ""
+            db_query_duration.observe(time.perf_counter() - started, name, operation)
+
+
+_pools: Dict[str, Tuple[Engine, PoolStats]] = {}
+
+
+def _pool_connections() -> Dict:
+    values = {}
+    for name, (engine, _) in _pools.items():
+        pool = engine.pool
+        if isinstance(pool, QueuePool):
+            values[(name, "size")] = pool.size()
+            values[(name, "checked_out")] = pool.checkedout()
+            values[(name, "overflow")] = max(pool.overflow(), 0)
+            values[(name, "max_overflow")] = pool._max_overflow
+    return values
+
+
+class PoolWaitHistogram(Metric):
+    """Renders the checkout wait histograms ``PoolStats`` already keeps."""
+    type = "histogram"
+
+    def samples(self) -> List[str]:
+        lines = []
+        for name, (engine, stats) in _pools.items():
+            snapshot = stats.snapshot(engine.pool)
+            for bound, cumulative in snapshot["wait_seconds_histogram"].items():
+                lines.append(_bucket_line(self.name, self.labelnames, (name,), bound, cumulative))
+            lines.append(f'{self.name}_count{{engine="{name}"}} {snapshot["checkouts"]}')
+            lines.append(f'{self.name}_sum{{engine="{name}"}} {snapshot["wait_seconds_sum"]}')
+        return lines
+
+
+registry.register(Gauge(
+    "db_pool_connections",
+    "Pool connections by state; checked_out near size + max_overflow means saturation.",
+    ("engine", "state"),
+    fn=_pool_connections,
+))
+registry.register(Gauge(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up waiting for a connection.",
+    ("engine",),
+    fn=lambda: {(name,): stats.snapshot(engine.pool)["timeouts"] for name, (engine, stats) in _pools.items()},
+    type="counter",
+))
+registry.register(PoolWaitHistogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection.",
+    ("engine",),
+))
+
+
+def register_pool(name: str, engine: Engine, stats: PoolStats) -> None:
+    """Export saturation and checkout waits of ``engine``'s pool under ``engine=name``."""
+    _pools[name] = (engine, stats)
+
+
+_method_names: Dict[Tuple[type, object], str] = {}
+
+
+def timed_run(run):
+    """Decorate ``BaseRepository._run`` to time each call per repository method.
+
+    The label comes from the ``_impl`` closure's qualified name
+    (``BaseRepository.get.<locals>._impl`` -> ``UserRepository.get``) and is
+    worked out once per closure code object.
+    """
+
+    @wraps(run)
+    async def wrapper(self, fn):
+        key = (type(self), getattr(fn, "__code__", fn))
+        method = _method_names.get(key)
+        if method is None:
+            qualname = getattr(fn, "__qualname__", "")
+            name = qualname.split(".<locals>", 1)[0].rsplit(".", 1)[-1] or "unknown"
+            method = _method_names[key] = f"{type(self).__name__}.{name}"
+
+        started = time.perf_counter()
+        try:
+            return await run(self, fn)
+        finally:
+            repository_call_duration.observe(time.perf_counter() - started, method)
+
+    return wrapper
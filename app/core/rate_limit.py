@@ -0,0 +1,82 @@
+import time
+from typing import Dict, Tuple
+
+from app.core.config import settings
+
+
+class TokenBucketLimiter:
+    async def consume(self, key: str, rate: float, burst: int, cost: int = 1) -> Tuple[bool, float]:
+        """Take ``cost`` tokens; returns (allowed, seconds until it would be)."""
+        raise NotImplementedError
+
+
+class MemoryTokenBucketLimiter(TokenBucketLimiter):
+    """Per-process buckets. No awaits inside ``consume``, so it is atomic on the loop."""
+
+    def __init__(self) -> None:
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    async def consume(self, key: str, rate: float, burst: int, cost: int = 1) -> Tuple[bool, float]:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (float(burst), now))
+        tokens = min(float(burst), tokens + (now - updated) * rate)
+
+        if tokens >= cost:
+            self._buckets[key] = (tokens - cost, now)
+            return True, 0.0
+        self._buckets[key] = (tokens, now)
+        return False, (cost - tokens) / rate
+
+
+# Refill, check and take in one script so concurrent workers cannot both
+# spend the last token. Uses the Redis clock so worker clocks never matter.
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+else
+  retry_after = (cost - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return {allowed, tostring(retry_after)}
+"""
+
+
+class RedisTokenBucketLimiter(TokenBucketLimiter):
+    """Buckets shared by every uvicorn worker; ``client`` is a ``redis.asyncio.Redis``."""
+
+    def __init__(self, client, prefix: str = "ratelimit") -> None:
+        self._prefix = prefix
+        self._script = client.register_script(_TOKEN_BUCKET_LUA)
+
+    async def consume(self, key: str, rate: float, burst: int, cost: int = 1) -> Tuple[bool, float]:
+        allowed, retry_after = await self._script(
+            keys=[f"{self._prefix}:{key}"], args=[rate, burst, cost]
+        )
+        return bool(int(allowed)), float(retry_after)
+
+
+def create_rate_limiter() -> TokenBucketLimiter:
+    if settings.RATE_LIMIT_BACKEND == "memory":
+        return MemoryTokenBucketLimiter()
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        from redis.asyncio import Redis
+
+        return RedisTokenBucketLimiter(Redis.from_url(settings.REDIS_URL))
+
+    raise ValueError(f"Unsupported RATE_LIMIT_BACKEND: {settings.RATE_LIMIT_BACKEND}")
@@ -1,12 +1,224 @@
+import asyncio
+import datetime as dt
+import hashlib
+import hmac
+import logging
+import math
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Optional
+
 from fastapi import Header, HTTPException
+from passlib.hash import bcrypt
 from starlette import status
 from app.core.config import settings
+from app.core.rate_limit import create_rate_limiter
+from app.db.repository.api_key import ApiKeyRepository
+from app.db.session import async_session_maker
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ApiKeyEntry:
+    id: Optional[int]
+    bucket: str
+    rate_limit: Optional[float]
+    burst: Optional[int]
+
+
+class ApiKeyVerifier:
+    """Checks keys against sha256 digests held in memory.
+
+    The settings key and every active DB key are hashed once when loaded;
+    a request hashes the presented key and compares it to all of them with
+    ``hmac.compare_digest``, so the time taken does not depend on which key
+    (if any) matched. ``start`` reloads keys every ``reload_interval``
+    seconds, so a new key can be added and the old one deactivated without
+    a restart. Usage is counted in memory and written every
+    ``flush_interval`` seconds.
+    """
+
+    def __init__(
+            self,
+            repo: ApiKeyRepository,
+            *,
+            static_key: Optional[str],
+            reload_interval: float,
+            flush_interval: float,
+    ) -> None:
+        self._repo = repo
+        self._static: Dict[bytes, ApiKeyEntry] = {}
+        if static_key:
+            self._static[self._digest(static_key)] = ApiKeyEntry(None, "default", None, None)
+        self._keys = dict(self._static)
+        self._reload_interval = reload_interval
+        self._flush_interval = flush_interval
+        self._usage: Counter = Counter()
+        self._tasks: list[asyncio.Task] = []
+
+    @staticmethod
+    def _digest(raw_key: str) -> bytes:
+        return hashlib.sha256(raw_key.encode()).digest()
+
+    def verify(self, raw_key: str) -> Optional[ApiKeyEntry]:
+        digest = self._digest(raw_key)
+        match = None
+        # No early exit: every known key is compared on every request.
+        for known, entry in self._keys.items():
+            if hmac.compare_digest(known, digest):
+                match = entry
+        if match is not None and match.id is not None:
+            self._usage[match.id] += 1
+        return match
+
+    async def reload(self) -> None:
+        rows = await self._repo.list_active()
+        keys = dict(self._static)
+        for row in rows:
+            keys[bytes.fromhex(row.key_hash)] = ApiKeyEntry(
+                row.id, str(row.id), row.rate_limit, row.burst
+            )
+        # Swapped in whole, so a request never sees a half-built table.
+        self._keys = keys
 
-def verify_api_key(x_api_key: str = Header(None, alias="X-API-Key")) -> str:
-    if not x_api_key or x_api_key != settings.API_KEY:
+    async def flush_usage(self) -> None:
+        if not self._usage:
+            return
+        usage, self._usage = self._usage, Counter()
+        try:
+            await self._repo.add_usage(usage, dt.datetime.now(dt.timezone.utc))
+        except Exception as e:
+            logger.error("Failed to flush usage for %d API keys: %s", len(usage), e)
+            self._usage.update(usage)
+
+    async def _every(self, interval: float, fn) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await fn()
+            except Exception as e:
+                logger.error("API key %s failed: %s", fn.__name__, e)
+
+    async def start(self) -> None:
+        await self.reload()
+        self._tasks = [
+            asyncio.create_task(self._every(self._reload_interval, self.reload)),
+            asyncio.create_task(self._every(self._flush_interval, self.flush_usage)),
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.flush_usage()
+
+
+api_key_verifier = ApiKeyVerifier(
+    ApiKeyRepository(async_session_maker),
+    static_key=settings.API_KEY,
+    reload_interval=settings.API_KEY_RELOAD_INTERVAL,
+    flush_interval=settings.API_KEY_USAGE_FLUSH_INTERVAL,
+)
+rate_limiter = create_rate_limiter()
+
+
+async def verify_api_key(x_api_key: str = Header(None, alias="X-API-Key")) -> str:
+    if not x_api_key:
+        raise _invalid_api_key()
+
+    entry = api_key_verifier.verify(x_api_key)
+    if entry is None:
+        raise _invalid_api_key()
+
+    allowed, retry_after = await rate_limiter.consume(
+        entry.bucket,
+        entry.rate_limit or settings.RATE_LIMIT_PER_SECOND,
+        entry.burst or settings.RATE_LIMIT_BURST,
+    )
+    if not allowed:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or missing API key",
-            headers={"WWW-Authenticate": "X-API-Key"},
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(math.ceil(retry_after))},
         )
     return x_api_key
+
+
+async def verify_metrics_access(
+        authorization: str = Header(None),
+        x_api_key: str = Header(None, alias="X-API-Key"),
+) -> None:
+    """``/metrics``: the bearer ``METRICS_TOKEN`` when one is set, otherwise an API key."""
+    if not settings.METRICS_TOKEN:
+        await verify_api_key(x_api_key)
+        return
+
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(
+            token.encode(), settings.METRICS_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or missing metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+def _invalid_api_key() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or missing API key",
+        headers={"WWW-Authenticate": "X-API-Key"},
+    )
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """bcrypt on a bounded thread pool, off the event loop.
+
+    bcrypt releases the GIL, so hashing in threads keeps the loop free for
+    API traffic. At most ``max_workers + max_queue`` operations are
+    admitted; beyond that callers get ``PasswordHasherBusy`` right away
+    instead of piling up behind a login storm.
+    """
+
+    def __init__(self, rounds: int, max_workers: int, max_queue: int) -> None:
+        self.rounds = rounds
+        self._handler = bcrypt.using(rounds=rounds)
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="password-hash")
+        self._capacity = max_workers + max_queue
+        self._in_flight = 0
+
+    async def _submit(self, fn, *args):
+        if self._in_flight >= self._capacity:
+            raise PasswordHasherBusy("Too many password operations in flight")
+        self._in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(self._handler.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._submit(self._handler.verify, password, hashed)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return bcrypt.from_string(hashed).rounds != self.rounds
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(
+    rounds=settings.PASSWORD_HASH_ROUNDS,
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_QUEUE,
+)
@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Mapping, Sequence, Type
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import after_commit, current_session
+
+
+def _is_datetime(attr) -> bool:
+    try:
+        return attr.expression.type.python_type is dt.datetime
+    except NotImplementedError:
+        return False
+
+
+# Set on a session once it has sent an INSERT/UPDATE/DELETE. Until that
+# transaction commits, what it reads may be data nobody else can see yet.
+_WROTE = "cache_wrote"
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_statement(orm_execute_state) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[_WROTE] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, flush_context) -> None:
+    session.info[_WROTE] = True
+
+
+def _bypassed() -> bool:
+    """True inside a unit of work that has written: neither read nor fill the cache."""
+    session = current_session.get()
+    return session is not None and session.info.get(_WROTE, False)
+
+
+class CacheBackend:
+    async def get(self, key: str) -> bytes | None:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def get_many(self, keys: Sequence[str]) -> list[bytes | None]:
+        raise NotImplementedError
+
+    async def set_many(self, items: Mapping[str, bytes], ttl: float) -> None:
+        raise NotImplementedError
+
+    async def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """Per-process LRU with a TTL on every entry."""
+
+    def __init__(self, max_size: int = 10_000) -> None:
+        self._max_size = max_size
+        self._data: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    async def get(self, key: str) -> bytes | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self._max_size:
+            self._data.popitem(last=False)
+
+    async def get_many(self, keys: Sequence[str]) -> list[bytes | None]:
+        return [await self.get(key) for key in keys]
+
+    async def set_many(self, items: Mapping[str, bytes], ttl: float) -> None:
+        for key, value in items.items():
+            await self.set(key, value, ttl)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+
+class RedisCache(CacheBackend):
+    """Shared across workers; ``client`` is a ``redis.asyncio.Redis``."""
+
+    def __init__(self, client, prefix: str = "cache") -> None:
+        self._client = client
+        self._prefix = prefix
+
+    def _key(self, key: str) -> str:
+        return f"{self._prefix}:{key}"
+
+    async def get(self, key: str) -> bytes | None:
+        return await self._client.get(self._key(key))
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self._client.set(self._key(key), value, px=int(ttl * 1000))
+
+    async def get_many(self, keys: Sequence[str]) -> list[bytes | None]:
+        if not keys:
+            return []
+        return await self._client.mget([self._key(k) for k in keys])
+
+    async def set_many(self, items: Mapping[str, bytes], ttl: float) -> None:
+        """One round trip: SETs with a TTL, pipelined (MSET cannot take one)."""
+        if not items:
+            return
+        async with self._client.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.set(self._key(key), value, px=int(ttl * 1000))
+            await pipe.execute()
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self._client.delete(*(self._key(k) for k in keys))
+
+
+class RepositoryCache:
+    """Read-through cache of ORM rows for one repository.
+
+    Rows are stored as JSON of their loaded column values and come back as
+    detached instances. Concurrent misses on the same key share one load.
+
+    Inside a unit of work (``current_session``) the cache only ever holds
+    committed rows: once the transaction has written it goes straight to
+    the database, and invalidations wait until it has committed.
+    """
+
+    def __init__(
+            self, namespace: str, backend: CacheBackend, model: Type[Any], ttl: float = 60
+    ) -> None:
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self._backend = backend
+        self._model = model
+        self._ttl = ttl
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _dump(self, obj: Any) -> bytes:
+        state = inspect(obj)
+        data = {}
+        for attr in state.mapper.column_attrs:
+            if attr.key not in state.dict:
+                continue
+            value = state.dict[attr.key]
+            data[attr.key] = value.isoformat() if isinstance(value, dt.datetime) else value
+        identity = state.mapper.polymorphic_identity
+        return json.dumps({"t": identity, "d": data}).encode()
+
+    def _load(self, raw: bytes) -> Any:
+        payload = json.loads(raw)
+        mapper = inspect(self._model)
+        if payload["t"] is not None and payload["t"] in mapper.polymorphic_map:
+            mapper = mapper.polymorphic_map[payload["t"]]
+
+        data = payload["d"]
+        for attr in mapper.column_attrs:
+            value = data.get(attr.key)
+            if isinstance(value, str) and _is_datetime(attr):
+                data[attr.key] = dt.datetime.fromisoformat(value)
+        return mapper.class_(**data)
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        if _bypassed():
+            return await loader()
+        return await self._get_or_load(self._key(key), loader)
+
+    async def _get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        raw = await self._backend.get(key)
+        if raw is not None:
+            self.hits += 1
+            return self._load(raw)
+
+        self.misses += 1
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            # wait() raises only if this caller is cancelled, not the leader.
+            await asyncio.wait([inflight])
+            if inflight.cancelled():
+                return await self._get_or_load(key, loader)
+            return inflight.result()
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            obj = await loader()
+            if obj is not None:
+                await self._backend.set(key, self._dump(obj), self._ttl)
+        except asyncio.CancelledError:
+            # The leader's request went away; followers must not wait forever.
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # retrieved here when nobody else was waiting
+            raise
+        else:
+            future.set_result(obj)
+            return obj
+        finally:
+            self._inflight.pop(key, None)
+
+    async def get(self, key: str) -> Any:
+        if _bypassed():
+            return None
+        raw = await self._backend.get(self._key(key))
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._load(raw)
+
+    async def set(self, key: str, obj: Any) -> None:
+        if not _bypassed():
+            await self._backend.set(self._key(key), self._dump(obj), self._ttl)
+
+    async def get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+        """The cached objects among ``keys``, in one backend call."""
+        if _bypassed() or not keys:
+            return {}
+        found = {}
+        for key, raw in zip(keys, await self._backend.get_many([self._key(k) for k in keys])):
+            if raw is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                found[key] = self._load(raw)
+        return found
+
+    async def set_many(self, objs: Mapping[str, Any]) -> None:
+        if not _bypassed() and objs:
+            await self._backend.set_many(
+                {self._key(k): self._dump(obj) for k, obj in objs.items()}, self._ttl
+            )
+
+    async def invalidate(self, *keys: str) -> None:
+        """Drop ``keys``; inside a unit of work, only after it commits.
+
+        Deleting earlier would let a concurrent reader put the old row
+        back before the new one is visible.
+        """
+        keys = tuple(self._key(k) for k in keys)
+        session = current_session.get()
+        if session is not None:
+            after_commit(session, lambda: self._backend.delete(*keys))
+        else:
+            await self._backend.delete(*keys)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+caches: Dict[str, RepositoryCache] = {}
+_redis_client = None
+
+
+def _make_backend() -> CacheBackend:
+    global _redis_client
+    if settings.CACHE_BACKEND == "memory":
+        return MemoryCache(settings.CACHE_MAX_SIZE)
+    if settings.CACHE_BACKEND == "redis":
+        if _redis_client is None:
+            from redis.asyncio import Redis
+
+            _redis_client = Redis.from_url(settings.REDIS_URL)
+        return RedisCache(_redis_client)
+
+    raise ValueError(f"Unsupported CACHE_BACKEND: {settings.CACHE_BACKEND}")
+
+
+def get_cache(namespace: str, model: Type[Any]) -> RepositoryCache | None:
+    """Process-wide cache for ``namespace``; ``None`` when caching is disabled."""
+    if settings.CACHE_BACKEND == "none":
+        return None
+    if namespace not in caches:
+        caches[namespace] = RepositoryCache(
+            namespace, _make_backend(), model, ttl=settings.CACHE_TTL
+        )
+    return caches[namespace]
@@ -0,0 +1,173 @@
+"""Row counts for whole tables without always scanning them.
+
+Strategies:
+
+* ``exact`` -- ``SELECT count(*)``; a full scan on PostgreSQL.
+* ``estimated`` -- the planner's statistics (``pg_class.reltuples`` on
+  PostgreSQL, ``information_schema.TABLES.TABLE_ROWS`` on MySQL). Only
+  used above ``estimate_min`` rows, where a scan is slow and a few
+  percent of error is harmless; smaller tables and SQLite count exactly.
+* ``cached`` -- an exact count kept for ``ttl`` seconds and adjusted in
+  between by committed INSERTs and DELETEs (minus those in savepoints
+  that were rolled back).
+
+All of them count the whole table; filtered counts must stay exact.
+"""
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple, Type
+
+from sqlalchemy import event, func, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+
+COUNT_STRATEGIES = ("exact", "estimated", "cached")
+
+
+class CountCache:
+    """Per-table counts, corrected by the row counts of committed writes."""
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Tuple[int, float]] = {}
+        self._installed = False
+
+    def get(self, table: str) -> Optional[int]:
+        entry = self._counts.get(table)
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        return entry[0]
+
+    def set(self, table: str, count: int) -> None:
+        with self._lock:
+            self._counts[table] = (count, time.monotonic() + self.ttl)
+
+    def _apply(self, deltas: Dict[str, Optional[int]]) -> None:
+        with self._lock:
+            for table, delta in deltas.items():
+                entry = self._counts.get(table)
+                if entry is None:
+                    continue
+                if delta is None:
+                    del self._counts[table]
+                else:
+                    self._counts[table] = (max(entry[0] + delta, 0), entry[1])
+
+    def install(self) -> None:
+        """Track INSERT/DELETE row counts per connection; apply them on commit."""
+        if self._installed:
+            return
+
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if not (context.isinsert or context.isdelete) or context.compiled is None:
+                return
+            table = getattr(context.compiled.statement, "table", None)
+            if table is None or table.name not in self._counts:
+                return
+
+            deltas = conn.info.setdefault("count_deltas", {})
+            rowcount = cursor.rowcount
+            # An upsert's rowcount mixes inserted and updated rows, and some
+            # drivers report -1: forget the count rather than guess.
+            upsert = getattr(context.compiled.statement, "_post_values_clause", None) is not None
+            if upsert or rowcount is None or rowcount < 0 or deltas.get(table.name, 0) is None:
+                deltas[table.name] = None
+            else:
+                sign = 1 if context.isinsert else -1
+                deltas[table.name] = deltas.get(table.name, 0) + sign * rowcount
+
+        def commit(conn):
+            conn.info.pop("count_savepoints", None)
+            deltas = conn.info.pop("count_deltas", None)
+            if deltas:
+                self._apply(deltas)
+
+        def rollback(conn):
+            conn.info.pop("count_deltas", None)
+            conn.info.pop("count_savepoints", None)
+
+        # A savepoint rolled back undoes its rows but not the outer
+        # transaction's: put the deltas back to where they were.
+        def savepoint(conn, name):
+            snapshots = conn.info.setdefault("count_savepoints", {})
+            snapshots[name] = dict(conn.info.get("count_deltas", {}))
+
+        def rollback_savepoint(conn, name, context):
+            snapshot = conn.info.get("count_savepoints", {}).pop(name, None)
+            if snapshot is not None:
+                conn.info["count_deltas"] = snapshot
+
+        def release_savepoint(conn, name, context):
+            conn.info.get("count_savepoints", {}).pop(name, None)
+
+        event.listen(Engine, "after_cursor_execute", after_cursor_execute)
+        event.listen(Engine, "commit", commit)
+        event.listen(Engine, "rollback", rollback)
+        event.listen(Engine, "savepoint", savepoint)
+        event.listen(Engine, "rollback_savepoint", rollback_savepoint)
+        event.listen(Engine, "release_savepoint", release_savepoint)
+        self._installed = True
+
+
+async def estimated_count(session: AsyncSession, table_name: str) -> Optional[int]:
+    """The planner's row estimate, or ``None`` where there is none."""
+    dialect = session.bind.dialect.name
+    if dialect == "postgresql":
+        res = await session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)"),
+            {"name": f'"{table_name}"'},
+        )
+    elif dialect == "mysql":
+        res = await session.execute(
+            text(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :name"
+            ),
+            {"name": table_name},
+        )
+    else:
+        return None
+
+    value = res.scalar_one_or_none()
+    # reltuples is -1 until the table has been vacuumed or analyzed.
+    if value is None or value < 0:
+        return None
+    return int(value)
+
+
+count_cache = CountCache(settings.COUNT_CACHE_TTL)
+
+
+async def count_rows(
+        session: AsyncSession,
+        model: Type[Any],
+        strategy: str | None = None,
+        *,
+        cache: CountCache = count_cache,
+        estimate_min: int = settings.COUNT_ESTIMATE_MIN,
+) -> int:
+    strategy = strategy or settings.COUNT_STRATEGY
+    if strategy not in COUNT_STRATEGIES:
+        raise ValueError(f"Unsupported count strategy: {strategy}")
+
+    table_name = model.__table__.name
+
+    if strategy == "estimated":
+        estimate = await estimated_count(session, table_name)
+        if estimate is not None and estimate >= estimate_min:
+            return estimate
+
+    if strategy == "cached":
+        cached = cache.get(table_name)
+        if cached is not None:
+            return cached
+        cache.install()
+
+    res = await session.execute(select(func.count()).select_from(model.__table__))
+    count = res.scalar_one()
+    if strategy == "cached":
+        cache.set(table_name, count)
+    return count
@@ -0,0 +1,97 @@
+"""Run EXPLAIN over the repository queries and flag full table scans.
+
+Usage::
+
+    python -m app.db.index_advisor
+
+Exits with status 1 when any query would scan a whole table, so it can
+gate a release. On PostgreSQL sequential scans are disabled for the
+session first, so a tiny development table does not hide a missing index.
+"""
+import asyncio
+import datetime as dt
+import re
+import sys
+from typing import Dict, List
+
+from sqlalchemy import Executable, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.db.models import Admin, CreditTransaction, User
+from app.db.repository.base import build_select
+from app.db.session import engine
+
+# Representative shapes of what the repositories send to the database.
+QUERIES: Dict[str, Executable] = {
+    "user.get": build_select(User).where(User.id == 1),
+    "user.get_by_chat_id": build_select(User).where(User.chat_id == 1),
+    "user.get_many_by_chat_id": build_select(User).where(User.chat_id.in_([1, 2, 3])),
+    "user.paginate_created_at": (
+        build_select(User)
+        .where(tuple_(User.created_at, User.id) > tuple_(dt.datetime(2024, 1, 1), 1))
+        .order_by(User.created_at, User.id)
+        .limit(100)
+    ),
+    "user.filter_by_type": build_select(User).where(User.type == "admin").limit(100),
+    "user.top_credits": build_select(User).order_by(User.credits.desc()).limit(100),
+    "credit.history": (
+        select(CreditTransaction)
+        .where(CreditTransaction.user_id == 1)
+        .order_by(CreditTransaction.id.desc())
+        .limit(100)
+    ),
+    "admin.get_identity": select(Admin.id, Admin.user_name, Admin.is_active).where(Admin.id == 1),
+}
+
+_SQLITE_SCAN = re.compile(r"^SCAN (TABLE )?\S+$")
+
+
+async def explain(conn: AsyncConnection, stmt: Executable) -> List[str]:
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup or ())
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    res = await conn.exec_driver_sql(prefix + str(compiled), params)
+    rows = res.all()
+
+    if conn.dialect.name == "sqlite":
+        return [row[-1] for row in rows]
+    if conn.dialect.name == "mysql":
+        return [
+            f"{row._mapping['table']}: type={row._mapping['type']} key={row._mapping['key']}"
+            for row in rows
+        ]
+    return [row[0] for row in rows]
+
+
+def full_scans(dialect_name: str, plan: List[str]) -> List[str]:
+    if dialect_name == "sqlite":
+        # "SCAN user USING INDEX ..." walks an index and is fine.
+        return [line for line in plan if _SQLITE_SCAN.match(line.strip())]
+    if dialect_name == "mysql":
+        return [line for line in plan if " type=ALL " in line]
+    return [line for line in plan if "Seq Scan" in line]
+
+
+async def advise() -> int:
+    flagged = 0
+    try:
+        async with engine.connect() as conn:
+            if conn.dialect.name == "postgresql":
+                await conn.exec_driver_sql("SET enable_seqscan = off")
+
+            for name, stmt in QUERIES.items():
+                plan = await explain(conn, stmt)
+                scans = full_scans(conn.dialect.name, plan)
+                print(f"[{'FULL SCAN' if scans else 'ok'}] {name}")
+                for line in scans:
+                    print(f"    {line.strip()}")
+                flagged += bool(scans)
+    finally:
+        await engine.dispose()
+
+    print(f"{flagged} of {len(QUERIES)} queries scan a whole table.")
+    return flagged
+
+
+if __name__ == "__main__":
+    sys.exit(1 if asyncio.run(advise()) else 0)
@@ -1,2 +1,4 @@
 from .admin import Admin
+from .api_key import ApiKey
+from .credit import CreditTransaction
 from .user import User
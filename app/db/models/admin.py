@@ -1,5 +1,5 @@
 from app.db.models.user import User
-from sqlalchemy import Boolean, ForeignKey, String
+from sqlalchemy import Boolean, ForeignKey, String, true
 from sqlalchemy.orm import Mapped, mapped_column
 
 
@@ -9,6 +9,9 @@ class Admin(User):
     id: Mapped[int] = mapped_column(ForeignKey("user.id"), primary_key=True)
 
     hashed_password: Mapped[str] = mapped_column(String, nullable=False)
+    is_active: Mapped[bool] = mapped_column(
+        Boolean, default=True, server_default=true(), nullable=False
+    )
 
     __mapper_args__ = {
         "polymorphic_identity": "admin",
@@ -0,0 +1,35 @@
+import datetime as dt
+
+from app.db.base import Base
+from sqlalchemy import BigInteger, Boolean, String, func, true
+from sqlalchemy.dialects.postgresql import TIMESTAMP
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class ApiKey(Base):
+    __tablename__ = "api_key"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(String, nullable=False, unique=True)
+    # sha256 hex digest; the plaintext key is shown once and never stored.
+    key_hash: Mapped[str] = mapped_column(String(64), nullable=False, unique=True)
+    is_active: Mapped[bool] = mapped_column(
+        Boolean, default=True, server_default=true(), nullable=False
+    )
+    # Tokens per second and bucket size; NULL falls back to the settings.
+    rate_limit: Mapped[float | None] = mapped_column(nullable=True)
+    burst: Mapped[int | None] = mapped_column(nullable=True)
+    # Flushed in batches by the verifier, so they trail live traffic slightly.
+    usage_count: Mapped[int] = mapped_column(
+        BigInteger, default=0, server_default="0", nullable=False
+    )
+    last_used_at: Mapped[dt.datetime | None] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )
+
+    created_at: Mapped[dt.datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        server_default=func.now(),
+        default=dt.datetime.utcnow,
+        nullable=False,
+    )
@@ -0,0 +1,25 @@
+import datetime as dt
+
+from app.db.base import Base
+from sqlalchemy import ForeignKey, String, func
+from sqlalchemy.dialects.postgresql import TIMESTAMP
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class CreditTransaction(Base):
+    """Append-only ledger of every change made to ``User.credits``."""
+
+    __tablename__ = "credit_transaction"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id"), nullable=False, index=True)
+    delta: Mapped[int] = mapped_column(nullable=False)
+    balance: Mapped[int] = mapped_column(nullable=False)
+    reason: Mapped[str | None] = mapped_column(String, nullable=True)
+
+    created_at: Mapped[dt.datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        server_default=func.now(),
+        default=dt.datetime.utcnow,
+        nullable=False,
+    )
@@ -1,7 +1,7 @@
 import datetime as dt
 
 from app.db.base import Base
-from sqlalchemy import func
+from sqlalchemy import DDL, Index, event, func
 from sqlalchemy.dialects.postgresql import TIMESTAMP
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -12,7 +12,7 @@ class User(Base):
     id: Mapped[int] = mapped_column(primary_key=True)
     user_name: Mapped[str] = mapped_column(nullable=False, unique=True)
     chat_id: Mapped[int] = mapped_column(nullable=False, unique=True)
-    credits: Mapped[int] = mapped_column(default=0)
+    credits: Mapped[int] = mapped_column(default=0, index=True)
 
     created_at: Mapped[dt.datetime] = mapped_column(
         TIMESTAMP(timezone=True),
@@ -21,9 +21,37 @@ class User(Base):
         nullable=False,
     )
 
-    type: Mapped[str] = mapped_column(default="user", nullable=False)
+    type: Mapped[str] = mapped_column(default="user", nullable=False, index=True)
+
+    __table_args__ = (
+        # Keyset pagination ordered by (created_at, id).
+        Index("ix_user_created_at_id", "created_at", "id"),
+    )
     __mapper_args__ = {
         "polymorphic_on": type,
         "polymorphic_identity": "user",
     }
 
+
+
+# SQLite full-text index for user search (see UserRepository.search). The
+# "user search" migration creates it on migrated databases; these create it
+# alongside the table for databases built from the metadata.
+_USER_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS user_search USING fts5("
+    "user_name, content='user', content_rowid='id', tokenize='trigram')",
+    'CREATE TRIGGER IF NOT EXISTS user_search_ai AFTER INSERT ON "user" BEGIN '
+    "INSERT INTO user_search(rowid, user_name) VALUES (new.id, new.user_name); END",
+    'CREATE TRIGGER IF NOT EXISTS user_search_ad AFTER DELETE ON "user" BEGIN '
+    "INSERT INTO user_search(user_search, rowid, user_name) VALUES ('delete', old.id, old.user_name); END",
+    'CREATE TRIGGER IF NOT EXISTS user_search_au AFTER UPDATE OF user_name ON "user" BEGIN '
+    "INSERT INTO user_search(user_search, rowid, user_name) VALUES ('delete', old.id, old.user_name); "
+    "INSERT INTO user_search(rowid, user_name) VALUES (new.id, new.user_name); END",
+)
+
+for _statement in _USER_SEARCH_DDL:
+    event.listen(User.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(
+    User.__table__, "before_drop",
+    DDL("DROP TABLE IF EXISTS user_search").execute_if(dialect="sqlite"),
+)
@@ -0,0 +1,90 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Type
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+# Upper bounds (seconds) of the checkout wait-time histogram buckets.
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class PoolStats:
+    """Checkout wait times and timeouts observed on one engine's pool."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._buckets = [0] * (len(WAIT_BUCKETS) + 1)
+        self._wait_sum = 0.0
+        self._checkouts = 0
+        self._timeouts = 0
+
+    def observe(self, waited: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self._buckets[bisect_left(WAIT_BUCKETS, waited)] += 1
+            self._wait_sum += waited
+            self._checkouts += 1
+            if timed_out:
+                self._timeouts += 1
+
+    def snapshot(self, pool: Pool) -> Dict[str, Any]:
+        with self._lock:
+            buckets = list(self._buckets)
+            wait_sum = self._wait_sum
+            checkouts = self._checkouts
+            timeouts = self._timeouts
+
+        cumulative, histogram = 0, {}
+        for bound, count in zip((*WAIT_BUCKETS, "+Inf"), buckets):
+            cumulative += count
+            histogram[str(bound)] = cumulative
+
+        info: Dict[str, Any] = {"pool_class": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            info.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+                max_overflow=pool._max_overflow,
+            )
+        info.update(
+            checkouts=checkouts,
+            timeouts=timeouts,
+            wait_seconds_sum=wait_sum,
+            wait_seconds_histogram=histogram,
+        )
+        return info
+
+
+def instrumented_pool_class(base: Type[QueuePool], stats: PoolStats) -> Type[QueuePool]:
+    """Subclass ``base`` so every checkout records how long it waited.
+
+    The stats live on the class, so they survive ``engine.dispose()``,
+    which rebuilds the pool from its class.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = base._do_get(self)
+        except exc.TimeoutError:
+            self._stats.observe(time.perf_counter() - started, timed_out=True)
+            raise
+        self._stats.observe(time.perf_counter() - started)
+        return conn
+
+    # Keep the base class's module so SQLAlchemy's pool logger stays under "sqlalchemy".
+    return type(
+        f"Instrumented{base.__name__}",
+        (base,),
+        {"_stats": stats, "_do_get": _do_get, "__module__": base.__module__},
+    )
+
+
+async_pool_stats = PoolStats()
+sync_pool_stats = PoolStats()
+
+AsyncPool = instrumented_pool_class(AsyncAdaptedQueuePool, async_pool_stats)
+SyncPool = instrumented_pool_class(QueuePool, sync_pool_stats)
@@ -0,0 +1,148 @@
+"""Per-request query profiling: counts, slow statements and likely N+1s.
+
+``install()`` hooks ``before/after_cursor_execute`` on every engine. The
+hooks only record while a ``profile_queries()`` block is active in the
+current context, so outside of one they cost a context-variable lookup.
+
+In tests::
+
+    with assert_max_queries(2):
+        await client.get("/api/user/1")
+"""
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryProfile:
+    slow_threshold: float = 0.2
+    count: int = 0
+    total_time: float = 0.0
+    statements: Counter = field(default_factory=Counter)
+    slow: List[Tuple[str, float]] = field(default_factory=list)
+    # An enclosing profile (e.g. a test's assertion around a profiled request)
+    # sees the same statements.
+    parent: Optional["QueryProfile"] = None
+
+    def record(self, statement: str, elapsed: float) -> None:
+        profile = self
+        while profile is not None:
+            profile.count += 1
+            profile.total_time += elapsed
+            profile.statements[statement] += 1
+            profile = profile.parent
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statements issued at least ``threshold`` times, most frequent first."""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+
+_current: ContextVar[Optional[QueryProfile]] = ContextVar("query_profile", default=None)
+_installed = False
+
+
+def redact(parameters: Any) -> Any:
+    """Keep the shape of bound parameters but not their values."""
+    if isinstance(parameters, dict):
+        return {key: f"<{type(value).__name__}>" for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: one set per row; the first is representative.
+            return [redact(parameters[0]), f"... {len(parameters)} rows"]
+        return [f"<{type(value).__name__}>" for value in parameters]
+    return parameters
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        context._profile_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    started = getattr(context, "_profile_started", None)
+    if profile is None or started is None:
+        return
+
+    elapsed = time.perf_counter() - started
+    profile.record(statement, elapsed)
+    if elapsed >= profile.slow_threshold:
+        profile.slow.append((statement, elapsed))
+        logger.warning(
+            "Slow query (%.1f ms): %s params=%s",
+            elapsed * 1000, statement, redact(parameters),
+            extra={"duration_ms": round(elapsed * 1000, 1)},
+        )
+
+
+def install() -> None:
+    """Listen on every ``Engine``; async engines run through one too."""
+    global _installed
+    if not _installed:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _installed = True
+
+
+@contextmanager
+def profile_queries(slow_threshold: float = 0.2) -> Iterator[QueryProfile]:
+    """Record every statement issued in this context until the block exits.
+
+    Tasks started inside the block inherit the same profile.
+    """
+    install()
+    profile = QueryProfile(slow_threshold=slow_threshold, parent=_current.get())
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryProfile]:
+    with profile_queries() as profile:
+        yield profile
+    if profile.count > limit:
+        listing = "\n".join(f"  {n}x {sql}" for sql, n in profile.statements.most_common())
+        raise AssertionError(f"Expected at most {limit} queries, got {profile.count}:\n{listing}")
+
+
+class QueryProfilerMiddleware:
+    """Profiles each HTTP request; warns about statements repeated ``n_plus_one`` times or more."""
+
+    def __init__(self, app: ASGIApp, *, slow_threshold: float, n_plus_one: int) -> None:
+        self.app = app
+        self.slow_threshold = slow_threshold
+        self.n_plus_one = n_plus_one
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with profile_queries(self.slow_threshold) as profile:
+            await self.app(scope, receive, send)
+
+        path = scope["path"]
+        for statement, n in profile.repeated(self.n_plus_one):
+            logger.warning(
+                "Possible N+1 on %s %s: statement ran %d times: %s",
+                scope["method"], path, n, statement,
+            )
+        logger.debug(
+            "%s %s issued %d queries in %.1f ms",
+            scope["method"], path, profile.count, profile.total_time * 1000,
+            extra={"query_count": profile.count},
+        )
@@ -1 +1,3 @@
+from .api_key import ApiKeyRepository
+from .credit import CreditRepository, InsufficientCredits
 from .user import UserRepository
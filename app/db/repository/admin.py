@@ -1,13 +1,78 @@
 from __future__ import annotations
 
-from passlib.hash import bcrypt
-from sqlalchemy import func, select, update
+import time
+from dataclasses import dataclass
 
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.core.security import password_hasher
 from app.db.models.admin import Admin
+from app.db.models.user import User
 from app.db.repository.base import BaseRepository
 from app.schemas.admins import AdminCreate, AdminUpdate
 
 
+@dataclass(frozen=True)
+class AdminIdentity:
+    id: int
+    user_name: str
+    is_active: bool
+
+
+class AdminIdentityCache:
+    """Short-lived per-process map of admin id -> identity.
+
+    Saves the admin panel a database round trip on every page, asset and
+    AJAX request. Changes through ``AdminRepository`` or the ORM (the admin
+    panel's views) evict in this process at once; other workers pick them
+    up within ``ttl`` seconds.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self._ttl = ttl
+        self._data: dict[int, tuple[float, AdminIdentity]] = {}
+
+    def get(self, admin_id: int) -> AdminIdentity | None:
+        entry = self._data.get(admin_id)
+        if entry is None:
+            return None
+        expires, identity = entry
+        if expires < time.monotonic():
+            self._data.pop(admin_id, None)
+            return None
+        return identity
+
+    def put(self, identity: AdminIdentity) -> None:
+        self._data[identity.id] = (time.monotonic() + self._ttl, identity)
+
+    def invalidate(self, admin_id: int) -> None:
+        self._data.pop(admin_id, None)
+
+
+admin_identities = AdminIdentityCache(settings.ADMIN_IDENTITY_TTL)
+
+_STALE_IDENTITIES = "stale_admin_identities"
+
+
+@event.listens_for(Admin, "after_update")
+@event.listens_for(Admin, "after_delete")
+def _admin_changed(mapper, connection, target: Admin) -> None:
+    # ORM writes bypass AdminRepository. Evict now, and again after the
+    # commit in case a concurrent request cached the old row meanwhile.
+    admin_identities.invalidate(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_STALE_IDENTITIES, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_committed(session: Session) -> None:
+    for admin_id in session.info.pop(_STALE_IDENTITIES, ()):
+        admin_identities.invalidate(admin_id)
+
+
 class AdminRepository(BaseRepository[Admin]):
 
     def __init__(self, session_factory):
@@ -30,12 +95,33 @@ class AdminRepository(BaseRepository[Admin]):
         return await self._run(_impl)
 
 
+    async def get_identity(self, id_: int) -> AdminIdentity | None:
+        identity = admin_identities.get(id_)
+        if identity is not None:
+            return identity
+
+        async def _impl(session):
+            res = await session.execute(
+                select(Admin.id, Admin.user_name, Admin.is_active)
+                .where(Admin.id == id_)
+            )
+            return res.first()
+
+        row = await self._run(_impl)
+        if row is None:
+            return None
+        identity = AdminIdentity(id=row.id, user_name=row.user_name, is_active=row.is_active)
+        admin_identities.put(identity)
+        return identity
+
     async def create(self, data: AdminCreate) -> Admin:
+        hashed_password = await password_hasher.hash(data.password)
+
         async def _impl(session):
             admin = Admin(
                 chat_id=data.chat_id,
                 user_name=data.user_name,
-                hashed_password=bcrypt.hash(data.password),
+                hashed_password=hashed_password,
                 is_active=True,
                 type="admin",
             )
@@ -46,20 +132,56 @@ class AdminRepository(BaseRepository[Admin]):
     async def update(self, id_: int, data: AdminUpdate) -> Admin | None:
         values = data.model_dump(exclude_unset=True)
         if "password" in values:
-            values["hashed_password"] = bcrypt.hash(values.pop("password"))
+            values["hashed_password"] = await password_hasher.hash(values.pop("password"))
+
+        admin_table = Admin.__table__
+        admin_values = {k: v for k, v in values.items() if k in admin_table.c}
+        user_values = {k: v for k, v in values.items() if k not in admin_table.c}
 
         async def _impl(session):
+            # Joined inheritance: each table gets its own UPDATE.
+            if user_values:
+                await session.execute(
+                    update(User).where(User.id == id_).values(**user_values)
+                )
+            if admin_values:
+                await session.execute(
+                    update(admin_table).where(admin_table.c.id == id_).values(**admin_values)
+                )
             res = await session.execute(
-                update(Admin)
+                select(Admin)
                 .where(Admin.id == id_)
-                .values(**values)
-                .returning(Admin)
+                .execution_options(populate_existing=True)
             )
             return res.scalars().first()
-        return await self._run(_impl)
+
+        admin = await self._run(_impl)
+        admin_identities.invalidate(id_)
+        return admin
+
+    async def delete(self, id_: int) -> int:
+        deleted_id = await super().delete(id_)
+        admin_identities.invalidate(id_)
+        return deleted_id
 
     async def authenticate(self, user_name: str, password: str) -> Admin | None:
         admin = await self.get_by_username(user_name)
-        if admin and bcrypt.verify(password, admin.hashed_password):
-            return admin
-        return None
+        if admin is None or not await password_hasher.verify(password, admin.hashed_password):
+            return None
+
+        if password_hasher.needs_rehash(admin.hashed_password):
+            # The work factor changed since this hash was made; upgrade it
+            # now, while the plaintext is at hand.
+            hashed_password = await password_hasher.hash(password)
+            admin_table = Admin.__table__
+
+            async def _impl(session):
+                await session.execute(
+                    update(admin_table)
+                    .where(admin_table.c.id == admin.id)
+                    .values(hashed_password=hashed_password)
+                )
+
+            await self._run(_impl)
+            admin.hashed_password = hashed_password
+        return admin
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import secrets
+from typing import Mapping, Sequence
+
+from sqlalchemy import select, update
+
+from app.db.models import ApiKey
+from app.db.repository.base import BaseRepository
+
+
+def hash_api_key(raw_key: str) -> str:
+    return hashlib.sha256(raw_key.encode()).hexdigest()
+
+
+class ApiKeyRepository(BaseRepository[ApiKey]):
+    def __init__(self, session_factory):
+        super().__init__(session_factory, ApiKey)
+
+    async def list_active(self) -> Sequence:
+        """Rows of (id, key_hash, rate_limit, burst) for every active key."""
+        async def _impl(session):
+            res = await session.execute(
+                select(ApiKey.id, ApiKey.key_hash, ApiKey.rate_limit, ApiKey.burst)
+                .where(ApiKey.is_active.is_(True))
+            )
+            return res.all()
+
+        return await self._run(_impl)
+
+    async def add_usage(self, counts: Mapping[int, int], used_at: dt.datetime) -> None:
+        """Add batched request counts, one UPDATE per key in a single transaction."""
+        async def _impl(session):
+            for key_id, count in counts.items():
+                await session.execute(
+                    update(ApiKey.__table__)
+                    .where(ApiKey.__table__.c.id == key_id)
+                    .values(
+                        usage_count=ApiKey.__table__.c.usage_count + count,
+                        last_used_at=used_at,
+                    )
+                )
+
+        await self._run(_impl)
+
+    async def create(
+            self, name: str, *, rate_limit: float | None = None, burst: int | None = None
+    ) -> tuple[ApiKey, str]:
+        """Create a key; the plaintext is returned here and nowhere else."""
+        raw_key = f"sk-{secrets.token_urlsafe(32)}"
+
+        async def _impl(session):
+            api_key = ApiKey(
+                name=name,
+                key_hash=hash_api_key(raw_key),
+                rate_limit=rate_limit,
+                burst=burst,
+            )
+            session.add(api_key)
+            return api_key
+
+        return await self._run(_impl), raw_key
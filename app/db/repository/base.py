@@ -2,13 +2,53 @@
 from __future__ import annotations
 
 from contextlib import asynccontextmanager
-from typing import Any, Generic, Sequence, Type, TypeVar, Callable, Awaitable
+from typing import Any, AsyncIterator, Generic, Sequence, Type, TypeVar, Callable, Awaitable
 
-from sqlalchemy import delete, select
+from sqlalchemy import Select, delete, select, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import load_only as load_only_option, with_polymorphic
+
+from app.core.metrics import timed_run
+from app.db.cache import RepositoryCache
+from app.db.count import count_rows
+from app.db.session import current_session
+from app.utils.cursor import decode_cursor, encode_cursor
 
 ModelT = TypeVar("ModelT")
 
+# Keyset orderings: each one ends with the primary key so the sort is total.
+PAGINATION_ORDERINGS: dict[str, tuple[str, ...]] = {
+    "id": ("id",),
+    "created_at": ("created_at", "id"),
+}
+
+
+def build_select(
+        model: Type[Any],
+        *,
+        columns: Sequence[str] | None = None,
+        load_only: Sequence[str] | None = None,
+        polymorphic: Sequence[Type[Any]] | str | None = None,
+) -> Select:
+    """Shape a SELECT for ``model``.
+
+    ``columns`` selects plain rows of just those columns. Otherwise whole
+    entities are loaded: from the base table only by default, joined with
+    the subclass tables listed in ``polymorphic`` (``"*"`` for all), and
+    restricted to the ``load_only`` attributes (others raise on access
+    instead of lazy-loading).
+    """
+    if columns is not None:
+        return select(*(getattr(model, name) for name in columns))
+
+    entity = model if polymorphic is None else with_polymorphic(model, polymorphic)
+    stmt = select(entity)
+    if load_only is not None:
+        stmt = stmt.options(
+            load_only_option(*(getattr(entity, name) for name in load_only), raiseload=True)
+        )
+    return stmt
+
 
 class BaseRepository(Generic[ModelT]):
 
@@ -16,12 +56,22 @@ class BaseRepository(Generic[ModelT]):
             self,
             session_factory: async_sessionmaker[AsyncSession],
             model: Type[ModelT],
+            cache: RepositoryCache | None = None,
     ) -> None:
         self._session_factory = session_factory
         self._model = model
+        self._cache = cache
 
     @asynccontextmanager
     async def _session_scope(self) -> AsyncSession:
+        shared = current_session.get()
+        if shared is not None:
+            # Inside a unit of work: flush so ids and constraint errors show
+            # up now, and leave the commit to whoever owns the session.
+            yield shared
+            await shared.flush()
+            return
+
         async with self._session_factory() as session:
             try:
                 yield session
@@ -31,32 +81,140 @@ class BaseRepository(Generic[ModelT]):
             else:
                 await session.commit()
 
+    @timed_run
     async def _run(
             self, fn: Callable[[AsyncSession], Awaitable[Any]]
     ) -> Any:
         async with self._session_scope() as session:
             return await fn(session)
 
-    async def get(self, id_: int) -> ModelT | None:
+    def _cache_keys(self, obj: ModelT) -> list[str]:
+        """Every cache key under which ``obj`` may be stored."""
+        return [f"id:{obj.id}"]
+
+    async def _invalidate(self, *objs: ModelT) -> None:
+        if self._cache is not None:
+            await self._cache.invalidate(*(k for obj in objs for k in self._cache_keys(obj)))
+
+    async def get(
+            self,
+            id_: int,
+            *,
+            load_only: Sequence[str] | None = None,
+            polymorphic: Sequence[Type[Any]] | str | None = None,
+    ) -> ModelT | None:
+        stmt = build_select(self._model, load_only=load_only, polymorphic=polymorphic)
+
         async def _impl(session: AsyncSession):
-            res = await session.execute(
-                select(self._model).where(self._model.id == id_)
-            )
+            res = await session.execute(stmt.where(self._model.id == id_))
             return res.scalar_one_or_none()
 
+        # Only whole default-shaped rows are cached.
+        if self._cache is not None and load_only is None and polymorphic is None:
+            return await self._cache.get_or_load(f"id:{id_}", lambda: self._run(_impl))
         return await self._run(_impl)
 
     async def list(
-            self, *, skip: int = 0, limit: int = 100
+            self,
+            *,
+            skip: int = 0,
+            limit: int = 100,
+            load_only: Sequence[str] | None = None,
+            polymorphic: Sequence[Type[Any]] | str | None = None,
     ) -> Sequence[ModelT]:
+        stmt = build_select(self._model, load_only=load_only, polymorphic=polymorphic)
+
         async def _impl(session: AsyncSession):
             res = await session.execute(
-                select(self._model).offset(skip).limit(limit)
+                stmt.offset(skip).limit(limit)
             )
             return res.scalars().all()
 
         return await self._run(_impl)
 
+    async def list_rows(
+            self, columns: Sequence[str], *, skip: int = 0, limit: int = 100
+    ) -> Sequence[Any]:
+        """Like ``list`` but selects only ``columns`` and returns plain rows."""
+        async def _impl(session: AsyncSession):
+            res = await session.execute(
+                build_select(self._model, columns=columns)
+                .order_by(self._model.id)
+                .offset(skip)
+                .limit(limit)
+            )
+            return res.all()
+
+        return await self._run(_impl)
+
+    async def paginate(
+            self,
+            *,
+            cursor: str | None = None,
+            limit: int = 100,
+            order_by: str = "id",
+            load_only: Sequence[str] | None = None,
+    ) -> tuple[Sequence[ModelT], str | None]:
+        """Keyset pagination: seeks past the cursor instead of OFFSET-scanning.
+
+        Returns the page and an opaque cursor for the next one, or ``None``
+        when the last page has been reached.
+        """
+        if order_by not in PAGINATION_ORDERINGS:
+            raise ValueError(f"Unsupported ordering: {order_by}")
+
+        columns = [getattr(self._model, name) for name in PAGINATION_ORDERINGS[order_by]]
+        stmt = (
+            build_select(self._model, load_only=load_only)
+            .order_by(*columns)
+            .limit(limit + 1)
+        )
+        if cursor is not None:
+            values = decode_cursor(cursor, order_by)
+            if len(values) != len(columns):
+                raise ValueError("Cursor does not match ordering")
+            stmt = stmt.where(tuple_(*columns) > tuple_(*values))
+
+        async def _impl(session: AsyncSession):
+            res = await session.execute(stmt)
+            return res.scalars().all()
+
+        rows = await self._run(_impl)
+        if len(rows) <= limit:
+            return rows, None
+
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            order_by, [getattr(last, name) for name in PAGINATION_ORDERINGS[order_by]]
+        )
+        return rows, next_cursor
+
+    async def stream_rows(
+            self,
+            columns: Sequence[str],
+            *,
+            after_id: int | None = None,
+            batch_size: int = 1000,
+    ) -> AsyncIterator[Sequence[Any]]:
+        """Yield plain row tuples in id order, ``batch_size`` rows at a time.
+
+        Rows come off a server-side cursor, so memory stays flat no matter
+        how large the table is; ``after_id`` resumes an interrupted read.
+        """
+        stmt = (
+            build_select(self._model, columns=columns)
+            .order_by(self._model.id)
+            .execution_options(yield_per=batch_size)
+        )
+        if after_id is not None:
+            stmt = stmt.where(self._model.id > after_id)
+
+        async with self._session_scope() as session:
+            result = await session.stream(stmt)
+            async for partition in result.partitions():
+                yield partition
+
     async def delete(self, id_: int) -> int:
         async def _impl(session: AsyncSession):
             res = await session.execute(
@@ -67,23 +225,29 @@ class BaseRepository(Generic[ModelT]):
             deleted_id = res.scalar_one_or_none()
             return deleted_id or 0
 
-        return await self._run(_impl)
+        deleted_id = await self._run(_impl)
+        if self._cache is not None:
+            await self._cache.invalidate(f"id:{id_}")
+        return deleted_id
 
     async def update(self, id_: int, data: dict) -> ModelT | None:
         async def _impl(session: AsyncSession):
             res = await session.execute(
-                select(self._model)
+                update(self._model)
                 .where(self._model.id == id_)
                 .values(**data)
                 .returning(self._model)
             )
             return res.scalar_one_or_none()
 
-    async def count(self) -> int:
-        from sqlalchemy import func
+        obj = await self._run(_impl)
+        if obj is not None:
+            await self._invalidate(obj)
+        return obj
 
+    async def count(self, strategy: str | None = None) -> int:
+        """Rows in the model's table; see ``app.db.count`` for the strategies."""
         async def _impl(session: AsyncSession):
-            res = await session.execute(select(func.count(self._model.id)))
-            return res.scalar_one()
+            return await count_rows(session, self._model, strategy)
 
         return await self._run(_impl)
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from typing import Mapping, Sequence
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.cache import RepositoryCache
+from app.db.models import CreditTransaction, User
+from app.db.repository.base import BaseRepository
+
+
+class InsufficientCredits(Exception):
+    pass
+
+
+class CreditRepository(BaseRepository[CreditTransaction]):
+    """Changes ``User.credits`` only through single conditional UPDATEs.
+
+    The balance check and the change happen in the same statement, so
+    concurrent debits can never overdraw or overwrite each other.
+    """
+
+    def __init__(self, session_factory, user_cache: RepositoryCache | None = None):
+        super().__init__(session_factory, CreditTransaction)
+        self._user_cache = user_cache
+
+    @staticmethod
+    async def _apply(
+            session: AsyncSession, user_id: int, delta: int, reason: str | None
+    ):
+        users = User.__table__
+        stmt = (
+            update(users)
+            .where(users.c.id == user_id)
+            .values(credits=users.c.credits + delta)
+        )
+        if delta < 0:
+            stmt = stmt.where(users.c.credits >= -delta)
+
+        if session.bind.dialect.update_returning:
+            res = await session.execute(stmt.returning(users.c.credits, users.c.chat_id))
+            row = res.first()
+        else:
+            # No RETURNING (mysql): the row stays locked by the UPDATE until
+            # commit, so reading it back in the same transaction is safe.
+            res = await session.execute(stmt)
+            row = None
+            if res.rowcount:
+                res = await session.execute(
+                    select(users.c.credits, users.c.chat_id).where(users.c.id == user_id)
+                )
+                row = res.first()
+
+        if row is None:
+            res = await session.execute(select(users.c.id).where(users.c.id == user_id))
+            if res.scalar_one_or_none() is None:
+                return None
+            raise InsufficientCredits(f"User {user_id} has fewer than {-delta} credits")
+
+        await session.execute(
+            insert(CreditTransaction.__table__).values(
+                user_id=user_id, delta=delta, balance=row.credits, reason=reason
+            )
+        )
+        return row
+
+    async def _changed(self, user_id: int, row) -> int | None:
+        if row is None:
+            return None
+        if self._user_cache is not None:
+            await self._user_cache.invalidate(f"id:{user_id}", f"chat:{row.chat_id}")
+        return row.credits
+
+    async def debit(self, user_id: int, amount: int, reason: str | None = None) -> int | None:
+        """Take ``amount`` credits; raises ``InsufficientCredits`` instead of going negative."""
+        if amount <= 0:
+            raise ValueError("amount must be positive")
+
+        async def _impl(session: AsyncSession):
+            return await self._apply(session, user_id, -amount, reason)
+
+        return await self._changed(user_id, await self._run(_impl))
+
+    async def credit(self, user_id: int, amount: int, reason: str | None = None) -> int | None:
+        if amount <= 0:
+            raise ValueError("amount must be positive")
+
+        async def _impl(session: AsyncSession):
+            return await self._apply(session, user_id, amount, reason)
+
+        return await self._changed(user_id, await self._run(_impl))
+
+    async def credit_many(
+            self, amounts: Mapping[int, int], reason: str | None = None
+    ) -> dict[int, int | None]:
+        """Apply one coalesced increment per user, all in one transaction."""
+
+        async def _impl(session: AsyncSession):
+            return {
+                user_id: await self._apply(session, user_id, amount, reason)
+                for user_id, amount in amounts.items()
+            }
+
+        rows = await self._run(_impl)
+        return {user_id: await self._changed(user_id, row) for user_id, row in rows.items()}
+
+    async def history(self, user_id: int, *, limit: int = 100) -> Sequence[CreditTransaction]:
+        async def _impl(session: AsyncSession):
+            res = await session.execute(
+                select(CreditTransaction)
+                .where(CreditTransaction.user_id == user_id)
+                .order_by(CreditTransaction.id.desc())
+                .limit(limit)
+            )
+            return res.scalars().all()
+
+        return await self._run(_impl)
@@ -1,23 +1,107 @@
+from typing import AsyncIterator, Sequence
+
+from app.db.cache import RepositoryCache
 from app.db.models import User
-from app.db.repository.base import BaseRepository
-from app.schemas import UserCreate, UserUpdate
-from sqlalchemy import select, update
+from app.db.repository.base import BaseRepository, build_select
+from app.schemas import UserCreate, UserUpdate, UserUpsertResult
+from sqlalchemy import bindparam, column, delete, func, literal_column, select, table, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import DBAPIError
+
+
+def _upsert_statement(dialect_name: str, rows: list[dict]):
+    table = User.__table__
+    if dialect_name == "sqlite":
+        stmt = sqlite.insert(table).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.chat_id],
+            set_={"user_name": stmt.excluded.user_name},
+        )
+    if dialect_name == "postgresql":
+        stmt = postgresql.insert(table).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.chat_id],
+            set_={"user_name": stmt.excluded.user_name},
+        )
+    if dialect_name == "mysql":
+        stmt = mysql.insert(table).values(rows)
+        return stmt.on_duplicate_key_update(user_name=stmt.inserted.user_name)
+
+    raise ValueError(f"Upsert is not supported for dialect: {dialect_name}")
+
+
+# SQLite FTS5 index over user.user_name (trigram tokenizer), kept in sync
+# by triggers; created by the "user search" migration, or with the table
+# by ``create_all`` (app/db/models/user.py).
+_user_search = table("user_search", column("rowid"), column("rank"))
+
+SEARCH_MIN_LENGTH = 3
+
+
+def _fts_match(term: str):
+    # Quoted as one FTS5 phrase, so the term is matched as a substring.
+    phrase = '"' + term.replace('"', '""') + '"'
+    return literal_column("user_search").op("MATCH")(bindparam(None, phrase))
+
+
+def search_condition(dialect_name: str, term: str):
+    """WHERE clause for users whose name contains ``term``.
+
+    PostgreSQL serves ``ILIKE`` from the pg_trgm GIN index and SQLite
+    from the FTS5 table; other backends fall back to a plain ``LIKE`` scan.
+    Terms shorter than ``SEARCH_MIN_LENGTH`` contain no trigram and cannot
+    use either index.
+    """
+    if dialect_name == "sqlite":
+        return User.id.in_(select(_user_search.c.rowid).where(_fts_match(term)))
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return User.user_name.ilike(f"%{escaped}%", escape="\\")
 
 
 class UserRepository(BaseRepository[User]):
-    def __init__(self, session_factory):
-        super().__init__(session_factory, User)
+    def __init__(self, session_factory, cache: RepositoryCache | None = None):
+        super().__init__(session_factory, User, cache)
+
+    def _cache_keys(self, obj: User) -> list[str]:
+        return [f"id:{obj.id}", f"chat:{obj.chat_id}"]
 
-    async def get(self, id: int) -> User | None:
+    async def get_by_chat_id(self, chat_id: int) -> User | None:
         async def _impl(session):
             res = await session.execute(
-                select(User).where(User.id == id)
+                select(User).where(User.chat_id == chat_id)
             )
             return res.scalars().first()
 
+        if self._cache is not None:
+            return await self._cache.get_or_load(f"chat:{chat_id}", lambda: self._run(_impl))
         return await self._run(_impl)
 
 
+    async def get_many_by_chat_id(self, chat_ids: Sequence[int]) -> dict[int, User]:
+        """Resolve many chat_ids; cache misses are read with one ``IN`` query."""
+        found: dict[int, User] = {}
+        missing = list(dict.fromkeys(chat_ids))
+        if self._cache is not None:
+            cached = await self._cache.get_many([f"chat:{chat_id}" for chat_id in missing])
+            for user in cached.values():
+                found[user.chat_id] = user
+            missing = [chat_id for chat_id in missing if chat_id not in found]
+        if not missing:
+            return found
+
+        async def _impl(session):
+            res = await session.execute(
+                select(User).where(User.chat_id.in_(missing))
+            )
+            return res.scalars().all()
+
+        loaded = await self._run(_impl)
+        for user in loaded:
+            found[user.chat_id] = user
+        if self._cache is not None:
+            await self._cache.set_many({f"chat:{user.chat_id}": user for user in loaded})
+        return found
+
     async def create(self, data: UserCreate) -> User:
         async def _impl(session):
             user = User(**data.model_dump())
@@ -37,4 +121,119 @@ class UserRepository(BaseRepository[User]):
             )
             return res.scalars().first()
 
+        user = await self._run(_impl)
+        if user is not None:
+            await self._invalidate(user)
+        return user
+
+    async def delete(self, id: int) -> int:
+        async def _impl(session):
+            res = await session.execute(
+                delete(User)
+                .where(User.id == id)
+                .returning(User.id, User.chat_id)
+            )
+            return res.first()
+
+        row = await self._run(_impl)
+        if row is None:
+            return 0
+        if self._cache is not None:
+            await self._cache.invalidate(f"id:{row.id}", f"chat:{row.chat_id}")
+        return row.id
+
+    @staticmethod
+    async def _upsert_chunk(session, items: Sequence[UserCreate]) -> list[UserUpsertResult]:
+        """Upsert ``items`` with one statement in a savepoint; one result per item, in order."""
+        # Later rows for the same chat_id win, as they would one by one.
+        rows = {item.chat_id: item.model_dump() for item in items}
+        chat_ids = list(rows)
+        async with session.begin_nested():
+            res = await session.execute(
+                select(User.chat_id).where(User.chat_id.in_(chat_ids))
+            )
+            existing = set(res.scalars().all())
+
+            await session.execute(
+                _upsert_statement(session.bind.dialect.name, list(rows.values()))
+            )
+
+            res = await session.execute(
+                select(User.chat_id, User.id).where(User.chat_id.in_(chat_ids))
+            )
+            ids = dict(res.all())
+
+        results = []
+        for item in items:
+            results.append(UserUpsertResult(
+                chat_id=item.chat_id,
+                id=ids.get(item.chat_id),
+                status="updated" if item.chat_id in existing else "created",
+            ))
+            # A repeated chat_id updates the row its first occurrence created.
+            existing.add(item.chat_id)
+        return results
+
+    async def bulk_upsert(
+            self, data: Sequence[UserCreate], *, chunk_size: int = 1000
+    ) -> AsyncIterator[list[UserUpsertResult]]:
+        """Insert or update users by ``chat_id`` with one multi-row statement per chunk.
+
+        Yields one result per input row, in input order, chunk by chunk as
+        soon as each is written. A chunk the database rejects is retried one
+        row at a time, each in its own savepoint, so only the offending rows
+        are reported as errors.
+        """
+        for start in range(0, len(data), chunk_size):
+            items = data[start:start + chunk_size]
+
+            async def _impl(session):
+                try:
+                    return await self._upsert_chunk(session, items)
+                except DBAPIError:
+                    pass
+
+                results = []
+                for item in items:
+                    try:
+                        results.extend(await self._upsert_chunk(session, [item]))
+                    except DBAPIError as e:
+                        results.append(UserUpsertResult(
+                            chat_id=item.chat_id, status="error", detail=str(e.orig)
+                        ))
+                return results
+
+            results = await self._run(_impl)
+            if self._cache is not None:
+                await self._cache.invalidate(*dict.fromkeys(
+                    key
+                    for r in results if r.status == "updated"
+                    for key in (f"id:{r.id}", f"chat:{r.chat_id}")
+                ))
+            yield results
+
+    async def search(
+            self, term: str, columns: Sequence[str], *, limit: int = 20
+    ) -> Sequence:
+        """Users whose name contains ``term``, best matches first, as plain rows."""
+        async def _impl(session):
+            dialect_name = session.bind.dialect.name
+            stmt = build_select(User, columns=columns)
+            if dialect_name == "sqlite":
+                stmt = (
+                    stmt.join(_user_search, _user_search.c.rowid == User.id)
+                    .where(_fts_match(term))
+                    .order_by(_user_search.c.rank, User.id)
+                )
+            else:
+                rank = (
+                    func.similarity(User.user_name, term).desc()
+                    if dialect_name == "postgresql"
+                    else func.length(User.user_name)
+                )
+                stmt = stmt.where(search_condition(dialect_name, term)).order_by(rank, User.id)
+
+            res = await session.execute(stmt.limit(limit))
+            return res.all()
+
         return await self._run(_impl)
@@ -1,24 +1,68 @@
 # app/db/session.py
-from typing import AsyncIterator
+import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Callable
 
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine
 
 from app.core.config import settings
+from app.core.metrics import instrument_engine, register_pool
+from app.db.pool import AsyncPool, SyncPool, sync_pool_stats
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
 
+logger = logging.getLogger(__name__)
+
+pool_options = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
+
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.DB_ECHO,
+    poolclass=AsyncPool,
+    **pool_options,
 )
 
-sync_engine = create_engine(
-    settings.SYNC_DATABASE_URL,
-    echo=settings.DB_ECHO,
-)
+_sync_engine: Engine | None = None
+
+
+def get_sync_engine() -> Engine:
+    """Blocking engine for scripts and tooling, created on first use.
+
+    Its users are Alembic and the storage garbage collector
+    (``StorageService.cleanup_orphaned_files``); the application itself,
+    admin included, only uses ``engine``.
+    """
+    global _sync_engine
+    if _sync_engine is None:
+        _sync_engine = create_engine(
+            settings.SYNC_DATABASE_URL,
+            echo=settings.DB_ECHO,
+            poolclass=SyncPool,
+            **pool_options,
+        )
+        instrument_engine(_sync_engine, "sync")
+        register_pool("sync", _sync_engine, sync_pool_stats)
+    return _sync_engine
+
+
+def peek_sync_engine() -> Engine | None:
+    """The sync engine if something has created it, without creating it."""
+    return _sync_engine
+
+
+def dispose_sync_engine() -> None:
+    if _sync_engine is not None:
+        _sync_engine.dispose()
 
 async_session_maker = async_sessionmaker(
     bind=engine,
@@ -27,6 +71,63 @@ async_session_maker = async_sessionmaker(
 )
 
 
-async def get_session() -> AsyncIterator[AsyncSession]:
+# Session of the unit of work active in the current request/task, if any.
+# Repositories pick it up instead of opening a session of their own.
+current_session: ContextVar[AsyncSession | None] = ContextVar(
+    "current_session", default=None
+)
+
+
+@asynccontextmanager
+async def unit_of_work() -> AsyncIterator[AsyncSession]:
+    """One session, one connection checkout and one commit for the whole block.
+
+    Nested calls reuse the outer unit of work.
+    """
+    session = current_session.get()
+    if session is not None:
+        yield session
+        return
+
     async with async_session_maker() as session:
+        token = current_session.set(session)
+        try:
+            yield session
+        except Exception:
+            session.info.pop("after_commit", None)
+            await session.rollback()
+            raise
+        else:
+            await session.commit()
+            for callback in session.info.pop("after_commit", ()):
+                try:
+                    await callback()
+                except Exception:
+                    # The data is committed; a failed hook must not turn that into an error.
+                    logger.exception("after_commit callback failed")
+        finally:
+            current_session.reset(token)
+
+
+def after_commit(session: AsyncSession, callback: Callable[[], Awaitable[None]]) -> None:
+    """Run ``callback`` once the unit of work owning ``session`` has committed.
+
+    Dropped if it rolls back instead.
+    """
+    session.info.setdefault("after_commit", []).append(callback)
+
+
+@asynccontextmanager
+async def savepoint() -> AsyncIterator[AsyncSession]:
+    """Roll back only the work done inside the block if it raises."""
+    session = current_session.get()
+    if session is None:
+        raise RuntimeError("savepoint() requires an active unit of work")
+
+    async with session.begin_nested():
+        yield session
+
+
+async def get_session() -> AsyncIterator[AsyncSession]:
+    async with unit_of_work() as session:
         yield session
@@ -1,5 +1,6 @@
+import logging
 from types import FrameType
-from fastapi import FastAPI, APIRouter
+from fastapi import Depends, FastAPI, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.staticfiles import StaticFiles
@@ -7,11 +8,31 @@ from starlette.staticfiles import StaticFiles
 from app.admin import setup_admin
 from app.api.routes import api_router
 from app.core.config import settings
-from app.services.storage import initialize_storage
-from app.db.session import engine, sync_engine
+from app.core import logging as app_logging
+from app.core.metrics import (
+    Gauge, MetricsMiddleware, instrument_engine, metrics_endpoint, register_pool, registry,
+)
+from app.core.middleware import AdmissionControlMiddleware, parse_route_limits
+from app.core.security import api_key_verifier, password_hasher, verify_metrics_access
+from app.services.credits import credit_batcher
+from app.services.storage import initialize_storage, storage_io
+from app.db.profiling import QueryProfilerMiddleware
+from app.db.pool import async_pool_stats
+from app.db.session import dispose_sync_engine, engine
+
+logger = logging.getLogger(__name__)
 
 
 def setup_middleware(app: FastAPI):
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        prefix=api_router.prefix,
+        max_concurrency=settings.ADMISSION_MAX_CONCURRENCY,
+        max_queue=settings.ADMISSION_MAX_QUEUE,
+        queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+        retry_after=settings.ADMISSION_RETRY_AFTER,
+        route_limits=parse_route_limits(settings.ADMISSION_ROUTE_LIMITS),
+    )
     app.add_middleware(SessionMiddleware, secret_key=settings.SECRET_KEY)
     app.add_middleware(
         CORSMiddleware,
@@ -20,6 +41,33 @@ def setup_middleware(app: FastAPI):
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    if settings.DB_PROFILING:
+        app.add_middleware(
+            QueryProfilerMiddleware,
+            slow_threshold=settings.DB_SLOW_QUERY_MS / 1000,
+            n_plus_one=settings.DB_N_PLUS_ONE_THRESHOLD,
+        )
+    app.add_middleware(app_logging.RequestIdMiddleware)
+    # Outermost, so time spent queued or refused by admission control counts.
+    app.add_middleware(MetricsMiddleware)
+
+
+def setup_metrics(app: FastAPI):
+    instrument_engine(engine.sync_engine, "async")
+    register_pool("async", engine, async_pool_stats)
+    registry.register(Gauge(
+        "log_records_dropped_total",
+        "Log records dropped because the log queue was full.",
+        fn=lambda: {(): getattr(app_logging.queue_handler, "dropped", 0)},
+        type="counter",
+    ))
+    if settings.METRICS_ENABLED:
+        app.add_api_route(
+            "/metrics",
+            metrics_endpoint,
+            include_in_schema=False,
+            dependencies=[Depends(verify_metrics_access)],
+        )
 
 
 def setup_static(app: FastAPI):
@@ -28,6 +76,12 @@ def setup_static(app: FastAPI):
 
 
 def start_app() -> FastAPI:
+    app_logging.setup_logging(
+        level=settings.LOG_LEVEL,
+        fmt=settings.LOG_FORMAT,
+        queue_size=settings.LOG_QUEUE_SIZE,
+        debug_sample_rate=settings.LOG_DEBUG_SAMPLE_RATE,
+    )
     app = FastAPI(
         title=settings.PROJECT_NAME,
         redoc_url="/redoc",
@@ -39,18 +93,25 @@ def start_app() -> FastAPI:
     app.include_router(api_router)
     setup_static(app)
     setup_middleware(app)
+    setup_metrics(app)
     setup_admin(app)
     initialize_storage()
 
     @app.on_event("startup")
     async def startup_db_event():
-        print("Database connection pool initialized.")
+        await api_key_verifier.start()
+        logger.info("Database connection pool initialized.")
 
     @app.on_event("shutdown")
     async def shutdown_db_event():
+        await credit_batcher.close()
+        await api_key_verifier.stop()
         await engine.dispose()
-        sync_engine.dispose()
-        print("Database connection pool disposed.")
+        dispose_sync_engine()
+        password_hasher.shutdown()
+        storage_io.shutdown()
+        logger.info("Database connection pool disposed.")
+        app_logging.stop_logging()
 
     return app
 
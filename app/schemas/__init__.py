@@ -1,2 +1,2 @@
 from .admins import Admin, AdminBase, AdminCreate, AdminUpdate
-from .users import User, UserCreate, UserUpdate
+from .users import CreditBalance, CreditChange, CreditTransaction, User, UserCreate, UserOrdering, UserPage, UserUpdate, UserUpsertResult
@@ -1,7 +1,7 @@
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, PositiveInt
 
 
 class UserCreate(BaseModel):
@@ -23,3 +23,39 @@ class User(BaseModel):
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class UserUpsertResult(BaseModel):
+    chat_id: int
+    id: Optional[int] = None
+    status: Literal["created", "updated", "error"]
+    detail: Optional[str] = None
+
+
+class CreditChange(BaseModel):
+    amount: PositiveInt
+    reason: Optional[str] = None
+
+
+class CreditBalance(BaseModel):
+    user_id: int
+    credits: int
+
+
+class CreditTransaction(BaseModel):
+    id: int
+    user_id: int
+    delta: int
+    balance: int
+    reason: Optional[str] = None
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class UserPage(BaseModel):
+    items: list[User]
+    next_cursor: Optional[str] = None
+
+
+UserOrdering = Literal["id", "created_at"]
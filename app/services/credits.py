@@ -0,0 +1,101 @@
+import asyncio
+import contextvars
+import logging
+from collections import defaultdict
+
+from app.core.config import settings
+from app.db.cache import get_cache
+from app.db.models import User
+from app.db.repository.credit import CreditRepository
+from app.db.session import async_session_maker
+
+logger = logging.getLogger(__name__)
+
+
+class CreditBatcher:
+    """Coalesces small credit increments into one UPDATE per user.
+
+    Increments for the same user and reason that arrive within
+    ``max_delay`` seconds are summed and written together; each caller
+    gets back the balance after the combined write.
+    """
+
+    def __init__(self, repo: CreditRepository, *, max_delay: float = 0.05, max_batch: int = 500):
+        self._repo = repo
+        self._max_delay = max_delay
+        self._max_batch = max_batch
+        self._pending: dict[str | None, dict[int, int]] = defaultdict(dict)
+        self._waiters: dict[str | None, dict[int, list[asyncio.Future]]] = defaultdict(
+            lambda: defaultdict(list)
+        )
+        self._size = 0
+        self._timer: asyncio.TimerHandle | None = None
+        # The loop only keeps weak references to tasks; these are ours.
+        self._tasks: set[asyncio.Task] = set()
+
+    async def credit(self, user_id: int, amount: int, reason: str | None = None) -> int | None:
+        if amount <= 0:
+            raise ValueError("amount must be positive")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        amounts = self._pending[reason]
+        amounts[user_id] = amounts.get(user_id, 0) + amount
+        self._waiters[reason][user_id].append(future)
+        self._size += 1
+
+        if self._size >= self._max_batch:
+            self._schedule(loop, 0)
+        elif self._timer is None:
+            self._schedule(loop, self._max_delay)
+        return await future
+
+    def _schedule(self, loop: asyncio.AbstractEventLoop, delay: float) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        # A fresh context keeps the flush out of the caller's unit of work.
+        self._timer = loop.call_later(delay, self._start_flush, context=contextvars.Context())
+
+    def _start_flush(self) -> None:
+        task = asyncio.ensure_future(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def close(self) -> None:
+        """Write what is still pending and wait for flushes already running."""
+        await self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        pending, waiters = self._pending, self._waiters
+        self._pending = defaultdict(dict)
+        self._waiters = defaultdict(lambda: defaultdict(list))
+        self._size = 0
+
+        for reason, amounts in pending.items():
+            try:
+                balances = await self._repo.credit_many(amounts, reason)
+            except Exception as e:
+                logger.error("Failed to flush %d batched credits: %s", len(amounts), e)
+                for futures in waiters[reason].values():
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(e)
+                continue
+
+            for user_id, futures in waiters[reason].items():
+                for future in futures:
+                    if not future.done():
+                        future.set_result(balances.get(user_id))
+
+
+credit_batcher = CreditBatcher(
+    CreditRepository(async_session_maker, get_cache("user", User)),
+    max_delay=settings.CREDIT_BATCH_DELAY,
+    max_batch=settings.CREDIT_BATCH_SIZE,
+)
@@ -1,18 +1,99 @@
+import asyncio
+import json
 import logging
+import mimetypes
+import os
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, asdict
+from datetime import datetime
+from functools import partial
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, AsyncIterable, Iterable
 
+import aiofiles
+from fastapi import UploadFile
 from libcloud.storage.drivers.local import LocalStorageDriver
 from pydantic.types import SecretType
+from sqlalchemy import MetaData, select
 from sqlalchemy_file import FileField, ImageField
 from sqlalchemy_file.file import File
 from sqlalchemy_file.storage import StorageManager
 
 from app.core.config import settings
+from app.services.storage_index import StorageUsageIndex, reconcile
 
 logger = logging.getLogger(__name__)
 
+METADATA_SUFFIX = ".metadata.json"
+
+
+def _track_usage(index: StorageUsageIndex, storage_root: Path) -> None:
+    """Keep ``index`` in step with every save and delete sqlalchemy-file makes."""
+    save_file = StorageManager.save_file.__func__
+    delete_file = StorageManager.delete_file.__func__
+
+    def _save_file(cls, name, *args, **kwargs):
+        stored = save_file(cls, name, *args, **kwargs)
+        upload_storage = kwargs.get("upload_storage") or (args[1] if len(args) > 1 else None)
+        storage = upload_storage or cls.get_default()
+        for object_name in (name, name + METADATA_SUFFIX):
+            index.add_path(storage, object_name, storage_root / storage / object_name)
+        return stored
+
+    def _delete_file(cls, path):
+        deleted = delete_file(cls, path)
+        storage, file_id = path.split("/")
+        index.remove(storage, file_id, file_id + METADATA_SUFFIX)
+        return deleted
+
+    StorageManager.save_file = classmethod(_save_file)
+    StorageManager.delete_file = classmethod(_delete_file)
+
+
+def _file_columns(metadata: MetaData) -> Dict[str, List]:
+    """FileField/ImageField columns of every table, grouped by upload storage."""
+    columns = defaultdict(list)
+    for table in metadata.tables.values():
+        for column in table.columns:
+            if isinstance(column.type, FileField):
+                storage = column.type.upload_storage or StorageManager.get_default()
+                columns[storage].append(column)
+    return columns
+
+
+def _file_id_expressions(column) -> List:
+    """JSON paths under which ``column`` references stored objects."""
+    expressions = [column["file_id"].as_string()]
+    if isinstance(column.type, ImageField):
+        expressions.append(column[("thumbnail", "file_id")].as_string())
+    return expressions
+
+
+class StorageIO:
+    """Filesystem calls on a bounded thread pool of their own.
+
+    Keeps slow disks off the event loop without competing with the
+    default executor (and the password hasher) for threads.
+    """
+
+    def __init__(self, max_workers: int) -> None:
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="storage-io")
+
+    async def run(self, fn, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, partial(fn, *args, **kwargs)
+        )
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+storage_io = StorageIO(settings.STORAGE_IO_WORKERS)
+
+
 @dataclass
 class Storages:
 
@@ -40,10 +121,13 @@ class StorageService:
 
             self.driver = LocalStorageDriver(str(self.storage_root))
 
+            self.usage = StorageUsageIndex(self.settings.STORAGE_INDEX_PATH)
+            _track_usage(self.usage, self.storage_root)
+
             self._register_storages()
 
             StorageService._initialized = True
-            logger.info(f"StorageService initialized with root: {self.storage_root}")
+            logger.info("StorageService initialized with root: %s", self.storage_root)
 
     def _register_storages(self):
 
@@ -54,7 +138,7 @@ class StorageService:
 
         try:
             if storage_name in self._storages:
-                logger.debug(f"Storage '{storage_name}' already registered")
+                logger.debug("Storage '%s' already registered", storage_name)
                 return
 
             storage_path = self.storage_root / storage_name
@@ -62,17 +146,20 @@ class StorageService:
 
             try:
                 container = self.driver.get_container(storage_name)
-                logger.debug(f"Container '{storage_name}' already exists")
+                logger.debug("Container '%s' already exists", storage_name)
             except Exception:
                 container = self.driver.create_container(storage_name)
-                logger.info(f"Created new container: {storage_name}")
+                logger.info("Created new container: %s", storage_name)
 
             StorageManager.add_storage(storage_name, container)
             self._storages.add(storage_name)
-            logger.info(f"Storage '{storage_name}' registered successfully")
+            if self.usage.reconciled_at(storage_name) is None:
+                # Files stored before the usage index knew about this storage.
+                reconcile(self.usage, self.storage_root, [storage_name])
+            logger.info("Storage '%s' registered successfully", storage_name)
 
         except Exception as e:
-            logger.error(f"Failed to ensure storage '{storage_name}': {e}")
+            logger.error("Failed to ensure storage '%s': %s", storage_name, e)
             raise
 
     @classmethod
@@ -151,17 +238,159 @@ class StorageService:
             file_path = cls.get_file_path(file_obj)
             if file_path and file_path.exists():
                 file_path.unlink()
-                logger.info(f"File deleted: {file_path}")
+                file_path.with_name(file_path.name + METADATA_SUFFIX).unlink(missing_ok=True)
+                storage, name = file_obj.path.split("/", 1)
+                cls().usage.remove(storage, name, name + METADATA_SUFFIX)
+                logger.info("File deleted: %s", file_path)
                 return True
             return False
         except Exception as e:
-            logger.error(f"Failed to delete file {file_obj.path}: {e}")
+            logger.error("Failed to delete file %s: %s", file_obj.path, e)
             return False
 
     @classmethod
-    def get_storage_info(cls) -> Dict[str, Any]:
+    def delete_files(cls, file_objs: Iterable[File]) -> int:
+        """Delete several files; one index update per storage. Returns how many were removed."""
+        removed = defaultdict(list)
+        for file_obj in file_objs:
+            if not file_obj:
+                continue
+            storage, name = file_obj.path.split("/", 1)
+            file_path = cls.get_file_path(file_obj)
+            try:
+                os.unlink(file_path)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.error("Failed to delete file %s: %s", file_obj.path, e)
+                continue
+            try:
+                os.unlink(file_path.with_name(file_path.name + METADATA_SUFFIX))
+            except FileNotFoundError:
+                pass
+            removed[storage].append(name)
 
         instance = cls()
+        for storage, names in removed.items():
+            instance.usage.remove(storage, *names, *(name + METADATA_SUFFIX for name in names))
+        deleted = sum(len(names) for names in removed.values())
+        logger.info("Deleted %d files", deleted)
+        return deleted
+
+    @classmethod
+    async def ensure_storage_async(cls, storage_name: str) -> None:
+        """Register ``storage_name``, creating its container off the event loop."""
+        instance = await storage_io.run(cls)
+        if storage_name not in instance._storages:
+            await storage_io.run(instance._ensure_storage, storage_name)
+
+    @classmethod
+    async def get_file_path_async(cls, file_obj: File) -> Path | None:
+        return await storage_io.run(cls.get_file_path, file_obj)
+
+    @classmethod
+    async def file_exists_async(cls, file_obj: File) -> bool:
+        path = await cls.get_file_path_async(file_obj)
+        return path is not None and await storage_io.run(path.is_file)
+
+    @classmethod
+    async def delete_file_async(cls, file_obj: File) -> bool:
+        return await storage_io.run(cls.delete_file, file_obj)
+
+    @classmethod
+    async def delete_files_async(cls, file_objs: Iterable[File], *, batch_size: int = 256) -> int:
+        """Delete ``file_objs`` in batches spread over the storage I/O pool."""
+        file_objs = [f for f in file_objs if f]
+        batches = [file_objs[i:i + batch_size] for i in range(0, len(file_objs), batch_size)]
+        results = await asyncio.gather(*(storage_io.run(cls.delete_files, batch) for batch in batches))
+        return sum(results)
+
+    @classmethod
+    async def save_stream(
+            cls,
+            chunks: AsyncIterable[bytes],
+            upload_storage: str,
+            *,
+            filename: str,
+            content_type: str | None = None,
+    ) -> File:
+        """Write ``chunks`` to ``upload_storage`` as they arrive and return the saved ``File``.
+
+        Only one chunk is held in memory at a time. The result is already
+        stored, so assigning it to a FileField column uploads nothing at
+        flush time; field validators and processors do not run on it, and
+        a rolled-back insert leaves the file for ``cleanup_orphaned_files``.
+        """
+        await cls.ensure_storage_async(upload_storage)
+        instance = cls()
+        content_type = content_type or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        file_id = str(uuid.uuid4())
+        directory = instance.storage_root / upload_storage
+        partial_path = directory / f".{file_id}.part"
+
+        size = 0
+        try:
+            async with aiofiles.open(partial_path, "wb", executor=storage_io.executor) as out:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    await out.write(chunk)
+        except BaseException:
+            await storage_io.run(partial_path.unlink, missing_ok=True)
+            raise
+
+        meta_data = {"filename": filename, "content_type": content_type}
+        await storage_io.run(instance._commit_upload, upload_storage, file_id, partial_path, meta_data)
+
+        path = f"{upload_storage}/{file_id}"
+        return File({
+            "filename": filename,
+            "content_type": content_type,
+            "size": size,
+            "files": [path],
+            "file_id": file_id,
+            "upload_storage": upload_storage,
+            "uploaded_at": datetime.utcnow().isoformat(),
+            "path": path,
+            "url": os.path.join(instance.driver.base_path, upload_storage, file_id),
+            "saved": True,
+        })
+
+    @classmethod
+    async def save_upload(
+            cls,
+            upload: UploadFile,
+            upload_storage: str,
+            *,
+            chunk_size: int | None = None,
+    ) -> File:
+        """``save_stream`` for a FastAPI ``UploadFile``, read ``chunk_size`` bytes at a time."""
+        chunk_size = chunk_size or settings.STORAGE_IO_CHUNK_SIZE
+
+        async def chunks():
+            while chunk := await upload.read(chunk_size):
+                yield chunk
+
+        return await cls.save_stream(
+            chunks(),
+            upload_storage,
+            filename=upload.filename or "upload",
+            content_type=upload.content_type,
+        )
+
+    def _commit_upload(self, storage: str, file_id: str, partial_path: Path, meta_data: Dict[str, Any]) -> None:
+        """Move a finished upload into place, next to the metadata file sqlalchemy-file expects."""
+        directory = self.storage_root / storage
+        target = directory / file_id
+        os.replace(partial_path, target)
+        metadata_name = file_id + METADATA_SUFFIX
+        (directory / metadata_name).write_text(json.dumps(meta_data))
+        self.usage.add_path(storage, file_id, target)
+        self.usage.add_path(storage, metadata_name, directory / metadata_name)
+
+    @classmethod
+    def get_storage_info(cls) -> Dict[str, Any]:
+        """Usage per registered storage, read from the usage index."""
+        instance = cls()
 
         info = {
             "storage_root": str(instance.storage_root),
@@ -170,30 +399,126 @@ class StorageService:
         }
 
         try:
+            totals = instance.usage.totals()
             for storage_name in StorageManager._storages.keys():
-                storage_path = instance.storage_root / storage_name
-                if storage_path.exists():
-                    size = sum(f.stat().st_size for f in storage_path.rglob('*') if f.is_file())
-                    file_count = len(list(storage_path.rglob('*')))
-
-                    info["registered_storages"].append({
-                        "name": storage_name,
-                        "path": str(storage_path),
-                        "size_bytes": size,
-                        "file_count": file_count
-                    })
-                    info["total_size"] += size
+                size, file_count = totals.get(storage_name, (0, 0))
+                info["registered_storages"].append({
+                    "name": storage_name,
+                    "path": str(instance.storage_root / storage_name),
+                    "size_bytes": size,
+                    "file_count": file_count
+                })
+                info["total_size"] += size
 
         except Exception as e:
-            logger.error(f"Failed to get storage info: {e}")
+            logger.error("Failed to get storage info: %s", e)
 
         return info
 
     @classmethod
-    def cleanup_orphaned_files(cls) -> Dict[str, int]:
+    def reconcile_usage(cls) -> Dict[str, tuple]:
+        """Rebuild the usage index from what is actually on disk."""
+        instance = cls()
+        totals = reconcile(
+            instance.usage,
+            instance.storage_root,
+            list(StorageManager._storages.keys()),
+            max_workers=instance.settings.STORAGE_RECONCILE_WORKERS,
+        )
+        logger.info("Storage usage index rebuilt for %d storages", len(totals))
+        return totals
 
-        logger.warning("cleanup_orphaned_files not implemented - requires database integration")
-        return {"deleted_files": 0, "freed_bytes": 0}
+    @classmethod
+    def cleanup_orphaned_files(
+            cls,
+            *,
+            grace_period: float = 24 * 60 * 60,
+            dry_run: bool = False,
+            batch_size: int = 2000,
+            resume: bool = True,
+    ) -> Dict[str, int]:
+        """Delete stored files no FileField/ImageField row refers to.
+
+        Each storage is first reconciled with the disk, so files the usage
+        index missed (written by another process, or ``.part`` leftovers of
+        interrupted ``save_stream`` uploads, which no row can refer to) are
+        collected too. File names are then read from the index in name
+        order, ``batch_size`` at a time, and each batch is checked with one
+        ``IN`` query per referencing column, so memory stays bounded. Files
+        newer than ``grace_period`` seconds are kept, since their row may
+        not be committed yet (or their upload is still being written).
+        Progress is saved after every batch; with ``resume`` an interrupted
+        run carries on where it stopped. Storages with a ``multiple=True``
+        field, or that no loaded model refers to, are skipped.
+        """
+        import app.db.models  # noqa: F401  (registers every table on Base.metadata)
+        from app.db.base import Base
+        from app.db.session import get_sync_engine
+
+        instance = cls()
+        index = instance.usage
+        columns = _file_columns(Base.metadata)
+        cutoff = time.time() - grace_period
+        result = {"scanned_files": 0, "orphaned_files": 0, "deleted_files": 0, "freed_bytes": 0}
+
+        with get_sync_engine().connect() as conn:
+            for storage in list(StorageManager._storages.keys()):
+                storage_columns = columns.get(storage, [])
+                if not storage_columns:
+                    logger.warning("Skipping storage '%s': no model column uses it", storage)
+                    continue
+                if any(column.type.multiple for column in storage_columns):
+                    logger.warning("Skipping storage '%s': multiple=True fields are not supported", storage)
+                    continue
+
+                reconcile(index, instance.storage_root, [storage])
+                expressions = [e for column in storage_columns for e in _file_id_expressions(column)]
+                cursor_key = f"gc_cursor:{storage}"
+                after = (index.get_meta(cursor_key) if resume else None) or ""
+
+                while True:
+                    batch = index.files(storage, after=after, limit=batch_size)
+                    if not batch:
+                        break
+                    after = batch[-1][0]
+                    result["scanned_files"] += len(batch)
+
+                    file_ids = {name.removesuffix(METADATA_SUFFIX) for name, _, _ in batch}
+                    referenced = set()
+                    for expression in expressions:
+                        res = conn.execute(select(expression).where(expression.in_(file_ids)))
+                        referenced.update(res.scalars())
+
+                    orphans = [
+                        (name, size) for name, size, mtime in batch
+                        if mtime < cutoff and name.removesuffix(METADATA_SUFFIX) not in referenced
+                    ]
+                    result["orphaned_files"] += len(orphans)
+                    if not dry_run and orphans:
+                        removed = []
+                        for name, size in orphans:
+                            try:
+                                os.unlink(instance.storage_root / storage / name)
+                            except FileNotFoundError:
+                                pass
+                            else:
+                                result["deleted_files"] += 1
+                                result["freed_bytes"] += size
+                            removed.append(name)
+                        index.remove(storage, *removed)
+
+                    if not dry_run:
+                        index.set_meta(cursor_key, after)
+
+                if not dry_run:
+                    index.set_meta(cursor_key, None)
+
+        logger.info(
+            "Orphan cleanup%s: scanned %d files, %d orphaned, %d deleted, %d bytes freed",
+            " (dry run)" if dry_run else "", result["scanned_files"], result["orphaned_files"],
+            result["deleted_files"], result["freed_bytes"],
+        )
+        return result
 
 
 def initialize_storage() -> StorageService:
@@ -0,0 +1,207 @@
+"""Persistent per-storage usage: bytes, file counts and per-file metadata.
+
+Kept in a small SQLite file next to the app (not under the served upload
+directory). Uploads and deletes update it one row at a time and triggers
+keep the per-storage totals, so reading usage never touches the files.
+
+Rebuild it from disk, or delete files no row refers to, with::
+
+    python -m app.services.storage_index
+    python -m app.services.storage_index gc --dry-run --grace 86400
+"""
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    storage TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    PRIMARY KEY (storage, name)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS totals (
+    storage TEXT PRIMARY KEY,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    files INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TRIGGER IF NOT EXISTS files_ai AFTER INSERT ON files BEGIN
+    INSERT INTO totals (storage, bytes, files) VALUES (new.storage, new.size, 1)
+    ON CONFLICT (storage) DO UPDATE SET bytes = bytes + new.size, files = files + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS files_ad AFTER DELETE ON files BEGIN
+    UPDATE totals SET bytes = bytes - old.size, files = files - 1 WHERE storage = old.storage;
+END;
+
+CREATE TRIGGER IF NOT EXISTS files_au AFTER UPDATE OF size ON files BEGIN
+    UPDATE totals SET bytes = bytes - old.size + new.size WHERE storage = new.storage;
+END;
+"""
+
+FileEntry = Tuple[str, int, float]
+
+
+class StorageUsageIndex:
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def reconciled_at(self, storage: str) -> Optional[float]:
+        """When ``storage`` was last rebuilt from disk; ``None`` if never."""
+        value = self.get_meta(f"reconciled_at:{storage}")
+        return float(value) if value is not None else None
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: Optional[str]) -> None:
+        with self._lock:
+            if value is None:
+                self._conn.execute("DELETE FROM meta WHERE key = ?", (key,))
+            else:
+                self._conn.execute(
+                    "INSERT INTO meta (key, value) VALUES (?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                    (key, value),
+                )
+
+    def add(self, storage: str, name: str, size: int, mtime: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO files (storage, name, size, mtime) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (storage, name) DO UPDATE SET size = excluded.size, mtime = excluded.mtime",
+                (storage, name, size, mtime),
+            )
+
+    def add_path(self, storage: str, name: str, path: Path) -> None:
+        """Index ``path`` as ``name``; does nothing if it is not on disk."""
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return
+        self.add(storage, name, st.st_size, st.st_mtime)
+
+    def remove(self, storage: str, *names: str) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM files WHERE storage = ? AND name = ?",
+                [(storage, name) for name in names],
+            )
+
+    def replace_storage(self, storage: str, entries: Iterable[FileEntry]) -> None:
+        """Swap in a fresh listing of ``storage`` in one transaction."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM files WHERE storage = ?", (storage,))
+                self._conn.execute("DELETE FROM totals WHERE storage = ?", (storage,))
+                self._conn.executemany(
+                    "INSERT INTO files (storage, name, size, mtime) VALUES (?, ?, ?, ?)",
+                    ((storage, name, size, mtime) for name, size, mtime in entries),
+                )
+                self._conn.execute(
+                    "INSERT INTO meta (key, value) VALUES (?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                    (f"reconciled_at:{storage}", str(time.time())),
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def totals(self) -> Dict[str, Tuple[int, int]]:
+        """``{storage: (bytes, files)}``; one row per storage, however many files."""
+        with self._lock:
+            rows = self._conn.execute("SELECT storage, bytes, files FROM totals").fetchall()
+        return {storage: (size, files) for storage, size, files in rows}
+
+    def files(self, storage: str, *, after: str = "", limit: int = 1000) -> List[FileEntry]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT name, size, mtime FROM files WHERE storage = ? AND name > ? ORDER BY name LIMIT ?",
+                (storage, after, limit),
+            ).fetchall()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def scan_files(root: Path) -> Iterator[FileEntry]:
+    """Every regular file under ``root`` as (relative name, size, mtime), via ``os.scandir``."""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(Path(entry.path))
+                    elif entry.is_file(follow_symlinks=False):
+                        st = entry.stat(follow_symlinks=False)
+                        name = os.path.relpath(entry.path, root).replace(os.sep, "/")
+                        yield name, st.st_size, st.st_mtime
+        except FileNotFoundError:
+            continue
+
+
+def reconcile(
+        index: StorageUsageIndex,
+        storage_root: Path,
+        storages: Iterable[str],
+        *,
+        max_workers: int = 4,
+) -> Dict[str, Tuple[int, int]]:
+    """Rebuild the index from disk, scanning storages in parallel."""
+
+    def _one(storage: str) -> None:
+        index.replace_storage(storage, list(scan_files(storage_root / storage)))
+
+    with ThreadPoolExecutor(max_workers, thread_name_prefix="storage-reconcile") as pool:
+        list(pool.map(_one, storages))
+    return index.totals()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from app.services.storage import StorageService
+
+    parser = argparse.ArgumentParser(prog="python -m app.services.storage_index")
+    parser.add_argument("command", nargs="?", choices=("reconcile", "gc"), default="reconcile")
+    parser.add_argument("--dry-run", action="store_true", help="gc: only report orphans")
+    parser.add_argument("--grace", type=float, default=24 * 60 * 60, help="gc: keep files newer than this (s)")
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--restart", action="store_true", help="gc: ignore a saved cursor")
+    args = parser.parse_args()
+
+    if args.command == "gc":
+        result = StorageService.cleanup_orphaned_files(
+            grace_period=args.grace,
+            dry_run=args.dry_run,
+            batch_size=args.batch_size,
+            resume=not args.restart,
+        )
+        for key, value in result.items():
+            print(f"{key}: {value}")
+    else:
+        for storage, (size, count) in sorted(StorageService.reconcile_usage().items()):
+            print(f"{storage}: {count} files, {size} bytes")
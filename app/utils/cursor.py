@@ -0,0 +1,40 @@
+import base64
+import binascii
+import datetime as dt
+import json
+from typing import Any, Sequence
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, dt.datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return dt.datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(order_by: str, values: Sequence[Any]) -> str:
+    payload = {"o": order_by, "v": [_encode_value(v) for v in values]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, order_by: str) -> list[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = [_decode_value(v) for v in payload["v"]]
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor("Malformed cursor") from e
+
+    if payload.get("o") != order_by:
+        raise InvalidCursor("Cursor was issued for a different ordering")
+    return values
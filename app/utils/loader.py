@@ -0,0 +1,60 @@
+import asyncio
+import contextvars
+from typing import Awaitable, Callable, Dict, Generic, Hashable, List, Mapping, Set, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class BatchLoader(Generic[K, V]):
+    """DataLoader-style coalescer.
+
+    Every ``load()`` made in the same event-loop tick is answered by one
+    call to ``batch_fn`` (split into chunks of ``max_batch_size``); keys the
+    batch function does not return resolve to ``None``.
+    """
+
+    def __init__(
+            self,
+            batch_fn: Callable[[List[K]], Awaitable[Mapping[K, V]]],
+            max_batch_size: int = 100,
+    ) -> None:
+        self._batch_fn = batch_fn
+        self._max_batch_size = max_batch_size
+        self._pending: Dict[K, asyncio.Future] = {}
+        # The loop only keeps weak references to tasks; these are ours.
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def load(self, key: K) -> V | None:
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            if not self._pending:
+                # Dispatch outside the caller's context so the batch never
+                # runs inside one particular request's unit of work.
+                loop.call_soon(self._dispatch, context=contextvars.Context())
+            future = loop.create_future()
+            self._pending[key] = future
+        return await asyncio.shield(future)
+
+    def _dispatch(self) -> None:
+        pending, self._pending = self._pending, {}
+        keys = list(pending)
+        for start in range(0, len(keys), self._max_batch_size):
+            chunk = {key: pending[key] for key in keys[start:start + self._max_batch_size]}
+            task = asyncio.ensure_future(self._load_chunk(chunk))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _load_chunk(self, chunk: Dict[K, asyncio.Future]) -> None:
+        try:
+            values = await self._batch_fn(list(chunk))
+        except Exception as e:
+            for future in chunk.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for key, future in chunk.items():
+            if not future.done():
+                future.set_result(values.get(key))